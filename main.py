@@ -1,15 +1,52 @@
-import io, re, random, string, os
+import io, re, random, string, os, asyncio, queue, hashlib, threading, copy, multiprocessing, logging, pickle
+from collections import OrderedDict
+from contextlib import asynccontextmanager, nullcontext
+from dataclasses import dataclass, asdict
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from typing import TYPE_CHECKING
 from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import Response, JSONResponse
+from fastapi.responses import Response, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
-from PIL import Image
-import pdfplumber
-from pdf2image import convert_from_bytes
-import pytesseract
-
-app = FastAPI(title="Invoice → Bill of Lading Generator")
+from starlette.background import BackgroundTask
+import pypdfium2 as pdfium
+try:
+    import orjson  # Rust JSON encoder for the /generate-bl-json/ payload
+except ImportError:  # fall back to JSONResponse's stdlib json
+    orjson = None
+try:
+    import hyperscan  # Intel Hyperscan: all boundary labels in one DFA pass
+except ImportError:  # fall back to the _BOUNDARY_RE lookahead scan
+    hyperscan = None
+try:
+    import ahocorasick  # pyahocorasick: one pass tells which field anchor words occur at all
+except ImportError:  # every field pattern is searched
+    ahocorasick = None
+try:
+    import blake3  # SIMD tree hash: keys the upload cache for a fraction of the extraction cost
+except ImportError:  # fall back to hashlib.blake2b
+    blake3 = None
+if TYPE_CHECKING:
+    # Rendering (ReportLab, PIL) and OCR (PyMuPDF, Tesseract) modules load inside the code paths
+    # that use them: /generate-bl-json/ and the parsing workers never import them
+    from PIL import Image
+    from reportlab.pdfbase import pdfdoc
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    # Build the bundled B/L template in the serving process, before the first request;
+    # not at import, which every spawned parsing worker repeats
+    _load_template(_BG_PATH)
+    # Spawn the parsing workers now too; one no-op per worker, submitted together so none is
+    # reused, keeps their interpreter start and import off the first uploads
+    await asyncio.gather(*(run_cpu(_warm_worker) for _ in range(_POOL_WORKERS)))
+    yield
+
+app = FastAPI(title="Invoice → Bill of Lading Generator", lifespan=_lifespan)
 
 # -------------------------------------------------------
 # CORS
@@ -25,80 +62,454 @@ app.add_middleware(
 # -------------------------------------------------------
 # PDF TEXT EXTRACTION
 # -------------------------------------------------------
+_OCR_DPI = 150  # enough for invoice print; fewer pixels than pdf2image's 200 dpi default
+# pytesseract runs one tesseract process per page, so pages OCR in parallel from threads.
+# One OpenMP thread per process lets OCR_CONCURRENCY of them share the cores; the process
+# pool's workers draw from one shared budget of that size (see _init_ocr_worker).
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+_OCR_CONCURRENCY = max(1, int(os.getenv("OCR_CONCURRENCY", os.cpu_count() or 1)))
+_OCR_EXECUTOR = ThreadPoolExecutor(max_workers=_OCR_CONCURRENCY)
+_OCR_SLOTS = None  # semaphore shared by the pool workers; None runs tesseract unthrottled
+
+def _init_ocr_worker(slots) -> None:
+    """Process-pool initializer: every worker takes a slot of the shared semaphore per tesseract run.
+
+    Each worker keeps its full OCR_CONCURRENCY thread pool, so a lone scan still OCRs pages in
+    parallel, while concurrent scans in different workers never exceed OCR_CONCURRENCY together.
+    """
+    global _OCR_SLOTS
+    _OCR_SLOTS = slots
+
+_OCR_CONFIG = os.getenv("OCR_CONFIG", "--oem 1 --psm 6")  # LSTM engine, one uniform text block
+_OCR_BINARIZE = [255 if p > 180 else 0 for p in range(256)]  # point() table: ink vs paper
+_TESS_LOCAL = threading.local()  # PyTessBaseAPI is not thread-safe: one per OCR worker, kept for reuse
+
+def _tess_options(config: str) -> dict | None:
+    """PyTessBaseAPI keyword arguments for a tesseract CLI config, or None if it uses other options."""
+    tokens = config.split()
+    options = {}
+    for flag, value in zip(tokens[::2], tokens[1::2]):
+        if flag in ("--oem", "--psm") and value.isdigit():
+            options[flag[2:]] = int(value)
+        elif flag == "-l":
+            options["lang"] = value
+        else:
+            return None
+    return None if len(tokens) % 2 else options
+
+# OCR_CONFIG with anything beyond --oem/--psm/-l keeps pytesseract, which hands it to tesseract verbatim
+_TESS_OPTIONS = _tess_options(_OCR_CONFIG)
+
+@lru_cache(maxsize=None)
+def _tesserocr():
+    """tesserocr if installed and OCR_CONFIG maps onto it, else None; looked up on the first OCR page only."""
+    if _TESS_OPTIONS is None:
+        return None
+    try:
+        import tesserocr  # in-process Tesseract API: no subprocess or traineddata reload per page
+    except ImportError:  # fall back to pytesseract's tesseract CLI wrapper
+        return None
+    return tesserocr
+
+def _ocr_page(page_img: "Image.Image") -> str:
+    """Binarize a grayscale page render and OCR it; clean 1-bit input saves Tesseract its own thresholding."""
+    from PIL import ImageOps
+    img = ImageOps.autocontrast(page_img).point(_OCR_BINARIZE, "1")
+    tesserocr = _tesserocr()
+    with _OCR_SLOTS or nullcontext():
+        if tesserocr is None:
+            import pytesseract
+            return pytesseract.image_to_string(img, config=_OCR_CONFIG)
+        api = getattr(_TESS_LOCAL, "api", None)
+        if api is None:
+            api = _TESS_LOCAL.api = tesserocr.PyTessBaseAPI(**_TESS_OPTIONS)
+        api.SetImage(img)
+        return api.GetUTF8Text()
+
+def _pdfium_text(pdf_bytes: bytes) -> str:
+    """Plain text of every page via PDFium; no layout analysis, which the parser never needed."""
+    doc = pdfium.PdfDocument(pdf_bytes)
+    try:
+        parts = []
+        for page in doc:
+            tp = page.get_textpage()
+            # PDFium ends lines with \r\n; keep the \n-terminated lines the parser was written against
+            page_text = tp.get_text_range().replace("\r\n", "\n")
+            parts.append(page_text + "\n" if page_text else page_text)
+            tp.close()
+            page.close()
+        return "\n".join(parts)
+    finally:
+        doc.close()
+
 def extract_text_from_pdf(pdf_bytes: bytes) -> str:
-    """Extract text from a PDF using pdfplumber; fallback to OCR if scanned."""
-    text = ""
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-        for page in pdf.pages:
-            t = page.extract_text()
-            if t:
-                text += t + "\n"
-    if not text.strip():  # OCR fallback
-        for page_img in convert_from_bytes(pdf_bytes):
-            text += pytesseract.image_to_string(page_img) + "\n"
+    """Extract text from a PDF using PDFium; fallback to OCR if scanned."""
+    text = _pdfium_text(pdf_bytes)
+    if not text.strip():  # OCR fallback: rasterize in-process, no poppler subprocess
+        import pymupdf
+        from PIL import Image
+        with pymupdf.open(stream=pdf_bytes, filetype="pdf") as doc:
+            futures = []
+            for i, page in enumerate(doc):
+                if i >= _OCR_CONCURRENCY:
+                    futures[i - _OCR_CONCURRENCY].result()  # cap rasterized pages held in memory
+                pix = page.get_pixmap(dpi=_OCR_DPI, colorspace=pymupdf.csGRAY, alpha=False)
+                # samples_mv is a view over the pixmap, so the only copy made is the PIL image
+                page_img = Image.frombytes("L", (pix.width, pix.height), pix.samples_mv)
+                pix = None  # release the raster before the next page is rendered
+                futures.append(_OCR_EXECUTOR.submit(_ocr_page, page_img))
+            text = "\n".join(f.result() for f in futures)  # one join instead of growing the string per page
     return text.strip()
 
 # -------------------------------------------------------
 # DATA EXTRACTION (Regex)
 # -------------------------------------------------------
-def extract_invoice_data(text: str) -> dict:
-    """Extract structured invoice data using robust regex; fallback randoms for missing fields."""
+_FLAGS = re.IGNORECASE | re.DOTALL
+
+# Single-value field patterns, compiled once and shared by every request
+_INVOICE_NO_RE = re.compile(r'Invoice\s*No\.?\s*[:\-]?\s*([A-Z0-9\-\/]+)', _FLAGS)
+_IE_CODE_RE = re.compile(r'I\.?E\.?\s*Code\s*No\.?\s*[:\-]?\s*([A-Z0-9]+)', _FLAGS)
+_PO_NO_RE = re.compile(r'Buyer.?s\s*Order\s*No\.?\s*[:\-]?\s*([A-Z0-9\-\/]+)', _FLAGS)
+_TERMS_RE = re.compile(r'Terms\s*of\s*Payment\s*[:\-]?\s*(.+?)(?:Country|Final|Port|$)', _FLAGS)
+_DRAWBACK_NO_RE = re.compile(r'Drawback\s*Sr\.?\s*No\.?\s*[:\-]?\s*([A-Z0-9\-\/]+)', _FLAGS)
+_BENEFIT_SCHEME_RE = re.compile(r'Benefit[s]?\s*under\s*ME[I|E]S\s*scheme\s*[:\-]?\s*([A-Za-z ]+)', _FLAGS)
+_TOTAL_RE = re.compile(r'(?:Amount\s*Chargeable|Total)\s*[:\-]?\s*(?:USD\s*)?([\d,]+(?:\.\d{2})?)', _FLAGS)
+_CARRIAGE_BY_RE = re.compile(r'(?:Pre|Pre\-)?\s*Carriage\s*By\s*[:\-]?\s*([A-Za-z \-]+)', _FLAGS)
+_PRE_CARRIAGE_RE = re.compile(r'Pre\-?Carriage\s*[:\-]?\s*([A-Za-z \-]+)', _FLAGS)
+_VESSEL_VOYAGE_RE = re.compile(r'Vessel\s*\/?\s*Voyage[ \t]*[:\-]?[ \t]*([A-Za-z0-9 .\-\/]+)', _FLAGS)
+_POL_KNOWN_RE = re.compile(r'(Nhava\s*Sheva|Nava\s*Sheva|Nahava\s*Seva|JNPT)', _FLAGS)
+_PORT_OF_LOADING_RE = re.compile(r'Port\s*of\s*Loading\s*[:\-]?\s*([^\n]+)', _FLAGS)
+_PORT_OF_SHIPMENT_RE = re.compile(r'Port\s*of\s*Shipment\s*[:\-]?\s*([^\n]+)', _FLAGS)
+_LOADING_PORT_RE = re.compile(r'Loading\s*Port\s*[:\-]?\s*([^\n]+)', _FLAGS)
+_POL_RE = re.compile(r'POL\s*[:\-]?\s*([^\n]+)', _FLAGS)
+_POD_KNOWN_RE = re.compile(r'(Singapore)', _FLAGS)
+_PORT_OF_DISCHARGE_RE = re.compile(r'Port\s*of\s*Discharge\s*[:\-]?\s*([^\n]+)', _FLAGS)
+_PORT_OF_DELIVERY_RE = re.compile(r'Port\s*of\s*Delivery\s*[:\-]?\s*([^\n]+)', _FLAGS)
+_DISCHARGE_PORT_RE = re.compile(r'Discharge\s*Port\s*[:\-]?\s*([^\n]+)', _FLAGS)
+_POD_RE = re.compile(r'POD\s*[:\-]?\s*([^\n]+)', _FLAGS)
+_PLACE_OF_RECEIPT_RE = re.compile(r'(?:Place|Place\s*of)\s*of?\s*Receipt\s*[:\-]?\s*([^\n]+)', _FLAGS)
+_PLACE_OF_ACCEPTANCE_RE = re.compile(r'Place\s*of\s*Acceptance\s*[:\-]?\s*([^\n]+)', _FLAGS)
+_FINAL_DESTINATION_RE = re.compile(r'Final\s*Destination\s*[:\-]?\s*([^\n]+)', _FLAGS)
+_PLACE_OF_DELIVERY_RE = re.compile(r'Place\s*of\s*Delivery\s*[:\-]?\s*([^\n]+)', _FLAGS)
+_COUNTRY_OF_ORIGIN_RE = re.compile(r'Country\s*of\s*Origin\s*[:\-]?\s*([A-Za-z ,]+)', _FLAGS)
+_COUNTRY_OF_DESTINATION_RE = re.compile(r'Country\s*of\s*Final\s*Destination\s*[:\-]?\s*([A-Za-z ,]+)', _FLAGS)
+_UNITS_MT_RE = re.compile(r'NO\.\s*OF\s*UNITS\s*\(In\s*Metric\s*Tons\)\s*([0-9,.]+)', _FLAGS)
+_NET_WEIGHT_MT_RE = re.compile(r'TOTAL\s*NET\s*WEIGHT\s*[:\-]?\s*([0-9,.]+)\s*MTS?', _FLAGS)
+_RATE_PER_UNIT_RE = re.compile(r'RATE\s*PER\s*UNIT\s*\(USD\)\s*([0-9,.]+)', _FLAGS)
+_AMOUNT_USD_RE = re.compile(r'Amount\s*\(USD\)\s*([0-9,.]+)', _FLAGS)
+_TOTAL_NET_WT_RE = re.compile(r'TOTAL\s*NET\s*WEIGHT\s*[:\-]?\s*([0-9,.]+)\s*(?:MTS?|KGS?)', _FLAGS)
+_TOTAL_GROSS_WT_RE = re.compile(r'TOTAL\s*GROSS\s*WEIGHT\s*[:\-]?\s*([0-9,.]+)\s*(?:MTS?|KGS?)', _FLAGS)
+_MEASUREMENT_CBM_RE = re.compile(r'MEASUREMENT\s*[:\-]?\s*([0-9,.]+\s*CBM)', _FLAGS)
+_TOTAL_AMOUNT_RE = re.compile(r'Total\s*[:\-]?\s*([0-9,.]+)', _FLAGS)
+_ANY_MT_RE = re.compile(r'([0-9,.]+)\s*MTS?', _FLAGS)
+_TOTAL_AMOUNT_LOOSE_RE = re.compile(r'Total\s*:?\s*([0-9,.]+)', _FLAGS)
+_HS_CODE_RE = re.compile(r'HS\s*CODE\s*:?\s*([0-9\.]+)', _FLAGS)
+
+# Literal word(s) a match of each field pattern must contain. One Aho-Corasick pass over the
+# lower-cased text finds the anchors present, and find() skips patterns that cannot match
+# (a miss still costs a full scan of the text, as IGNORECASE defeats re's literal prefix search).
+_FIELD_ANCHORS = {
+    _INVOICE_NO_RE: ("invoice",), _IE_CODE_RE: ("code",), _PO_NO_RE: ("order",),
+    _TERMS_RE: ("terms",), _DRAWBACK_NO_RE: ("drawback",), _BENEFIT_SCHEME_RE: ("benefit",),
+    _TOTAL_RE: ("chargeable", "total"), _CARRIAGE_BY_RE: ("carriage",), _PRE_CARRIAGE_RE: ("carriage",),
+    _POL_KNOWN_RE: ("nhava", "nava", "nahava", "jnpt"),
+    _PORT_OF_LOADING_RE: ("loading",), _PORT_OF_SHIPMENT_RE: ("shipment",), _LOADING_PORT_RE: ("loading",),
+    _POL_RE: ("pol",), _POD_KNOWN_RE: ("singapore",), _PORT_OF_DISCHARGE_RE: ("discharge",),
+    _PORT_OF_DELIVERY_RE: ("delivery",), _DISCHARGE_PORT_RE: ("discharge",), _POD_RE: ("pod",),
+    _PLACE_OF_RECEIPT_RE: ("receipt",), _PLACE_OF_ACCEPTANCE_RE: ("acceptance",),
+    _FINAL_DESTINATION_RE: ("destination",), _PLACE_OF_DELIVERY_RE: ("delivery",),
+    _COUNTRY_OF_ORIGIN_RE: ("origin",), _COUNTRY_OF_DESTINATION_RE: ("destination",),
+    _UNITS_MT_RE: ("units",), _NET_WEIGHT_MT_RE: ("weight",), _RATE_PER_UNIT_RE: ("rate",),
+    _AMOUNT_USD_RE: ("amount",), _TOTAL_NET_WT_RE: ("weight",), _TOTAL_GROSS_WT_RE: ("gross",),
+    _MEASUREMENT_CBM_RE: ("measurement",), _TOTAL_AMOUNT_RE: ("total",), _ANY_MT_RE: ("mt",),
+    _TOTAL_AMOUNT_LOOSE_RE: ("total",), _HS_CODE_RE: ("code",),
+}
+
+def _build_anchor_automaton():
+    """Aho-Corasick automaton over every _FIELD_ANCHORS word, or None without pyahocorasick."""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for word in {w for words in _FIELD_ANCHORS.values() for w in words}:
+        automaton.add_word(word, word)
+    automaton.make_automaton()
+    return automaton
+
+_ANCHOR_AUTOMATON = _build_anchor_automaton()
+
+def _present_anchors(raw: str):
+    """Anchor words occurring in raw, or None when every pattern has to be searched."""
+    # lower() only mirrors IGNORECASE matching for ASCII text
+    if _ANCHOR_AUTOMATON is None or not raw.isascii():
+        return None
+    return {word for _end, word in _ANCHOR_AUTOMATON.iter(raw.lower())}
+
+# Block fallbacks, exporter name heuristics, container/goods/marks scans
+_USD_RE = re.compile(r'USD', re.IGNORECASE)
+_LINES_RE = re.compile(r'[\r\n]+')
+_LINE_INDENT_RE = re.compile(r'\n\s*')
+_SPACE_RUN_RE = re.compile(r'[ \t]{2,}')
+_EXPORTER_SPAN_RE = re.compile(r'(?:Exporter|Shipper)\s*:\s*([\s\S]{10,800}?)(?=Consignee|Notify\s*Party|Invoice\s*No\.?|Country|Pre-?Carriage|$)', _FLAGS)
+_CONSIGNEE_SPAN_RE = re.compile(r'Consignee\s*:\s*([\s\S]{10,800}?)(?=Notify\s*Party|Country|Pre-?Carriage|Invoice\s*No\.?|$)', _FLAGS)
+_CONSIGNEE_LOOSE_RE = re.compile(r'Consignee\s*[:\-]?\s*([\s\S]{10,500}?)(?=Notify|Country|Port|Vessel|$)', _FLAGS)
+_SAME_AS_CONSIGNEE_RE = re.compile(r'same as consignee', re.IGNORECASE)
+_NON_NAME_LINE_RE = re.compile(r'Invoice|Bill\s*of\s*Lading|B/L|Date|Tax|GST', re.IGNORECASE)
+_TOP_HEADING_RE = re.compile(r'Invoice|Bill\s*of\s*Lading|B/L|Date', re.IGNORECASE)
+_EXPORTER_LABEL_RE = re.compile(r'^(?:Exporter|Shipper)\s*:?\s*', re.IGNORECASE | re.MULTILINE)
+# Exporter-block cleanup in one pass: drop I.E. Code / Invoice No / Buyer's Order lines and strip
+# a leading Exporter:/Shipper: label, whose trailing whitespace may run over dropped lines just
+# as it did when the drops were separate sub() passes ahead of the label strip
+_EXPORTER_NOISE_LINE = r"(?:.*\bI\.?E\.?\s*Code.*$\n?|.*\bInvoice\s*No\.?\b.*$\n?|.*Buyer'?s\s*Order\s*No\.?\b.*$\n?)"
+_EXPORTER_STRIP_RE = re.compile(
+    rf'^(?:{_EXPORTER_NOISE_LINE}|(?:Exporter|Shipper)(?:^{_EXPORTER_NOISE_LINE}|\s)*:?(?:^{_EXPORTER_NOISE_LINE}|\s)*)',
+    re.IGNORECASE | re.MULTILINE
+)
+_PO_LINE_RE = re.compile(r'^\s*PO[-\s]*\d+\b.*$\n?', re.IGNORECASE | re.MULTILINE)
+_BLANK_LINES_RE = re.compile(r'\n{3,}')
+_TOP_BLOCK_RE = re.compile(r'^(.*?)(?=\n\s*(?:Consignee|Notify\s*Party|Invoice\s*No\.?|I\.?E\.?\s*Code|$))', _FLAGS)
+_TOP_UNTIL_LABEL_RE = re.compile(r'^(.*?)(?=\bConsignee\b|\bNotify\s*Party\b|\bInvoice\s*No\.?|\bBuyer\'?s\s*Order\b|\bCountry\b)', _FLAGS)
+_PRE_CONSIGNEE_RE = re.compile(r'(.*?)(?=\bConsignee\b|\bNotify\s*Party\b|\bInvoice\s*No\.?|\bBuyer\'??s\s*Order\b)', _FLAGS)
+_COMPANY_TOKEN_RE = re.compile(r'\b(IMPEX|PVT|LTD|LLP|LLC|TRADING|EXPORTS|IMPORTS|CO\.|COMPANY|INDIA)\b', re.IGNORECASE)
+_COMPANY_WORD_RE = re.compile(r'\b(IMPEX|PVT|LTD|LLC|COMPANY|TRADING|EXPORTS|IMPORTS|INDIA|GMBH)\b', re.IGNORECASE)
+_COMPANY_LINE_RE = re.compile(r'^(.*(?:IMPEX|PVT|LTD|LLP|LLC|TRADING|EXPORTS|IMPORTS|COMPANY|CO\.)[^\n]*)$', re.IGNORECASE | re.MULTILINE)
+_CAPS_NAME_RE = re.compile(r'^[A-Z0-9 &,\-\.]{{3,}}$')
+_CAPS_LINE_RE = re.compile(r'^[A-Z0-9 &,\-\.]{3,}$')
+_TITLE_CASE_RE = re.compile(r'^[A-Z][a-z]+(\s+[A-Z][a-z]+)+')
+_ADDRESS_HINT_RE = re.compile(r'\bPlot\b|\bGIDC\b|\bIndustrial\b|\bEstate\b|\bPhase\b|\bIndia\b|\d{3,}', re.IGNORECASE)
+_HEADING_PREFIX_RE = re.compile(r'^(Exporter|Shipper|INVOICE|BILL|TAX)', re.IGNORECASE)
+_DENY_WORD_RE = re.compile(r'INVOICE|BILL|TAX|GST|AMOUNT|DATE', re.IGNORECASE)
+_HAS_LETTER_RE = re.compile(r'[A-Za-z]')
+_INVOICE_WORD_RE = re.compile(r'INVOICE', re.IGNORECASE)
+_GENERIC_HEADING_RE = re.compile(r'^(INVOICE|BILL|TAX|STATEMENT)$', re.IGNORECASE)
+_BARE_HEADING_RE = re.compile(r'^(INVOICE|BILL|TAX)$', re.IGNORECASE)
+_REF_PREFIX_RE = re.compile(r'^(Invoice|PO|I\.?E\.?|Buyer)', re.IGNORECASE)
+_EXPORTER_LINE_RE = re.compile(r'Exporter\s*[:\-]?\s*(.+)', re.IGNORECASE)
+_EXPORTER_REST_RE = re.compile(r'Exporter\s*[:\-]?\s*(.+)', _FLAGS)
+_CONTAINER_SEAL_RE = re.compile(r'Container\s*&\s*Seal\s*nos?\.?[ \t]*[:\-]?[ \t]*([A-Z0-9\/\-]+)[ \t]*[\/\-\| ][ \t]*([A-Z0-9]+)', _FLAGS)
+# Shapes a printed container / seal number must have; anything else ('As per packing list')
+# is left empty so the random placeholder is used
+_CONTAINER_NO_RE = re.compile(r'[A-Z]{4}\d{7}')  # ISO 6346: owner code, category letter, serial, check digit
+_SEAL_NO_RE = re.compile(r'[A-Z0-9\-]*\d[A-Z0-9\-]*')
+# Header labels outside _LABEL_ALTS that can share a row with the vessel/voyage value
+_SHIPMENT_LABEL_RE = re.compile(
+    r'Port\s*of\s*(?:Loading|Discharge|Delivery|Shipment)|Place\s*of\s*(?:Receipt|Delivery|Acceptance)'
+    r'|Final\s*Destination|Container|Seal\s*No|Marks',
+    re.IGNORECASE
+)
+_GOODS_RE = re.compile(
+    r'HS\s*CODE\s*:\s*([0-9\.]+)[\s\S]*?QUANTITY\s*:\s*([0-9,]+\s*PCS)[\s\S]*?WEIGHT\s*:\s*([0-9,\.]+\s*KGS?)[\s\S]*?PACKING\s*:\s*([0-9,]+\s*CARTONS?)',
+    _FLAGS
+)
+_SR_MARKS_RE = re.compile(r'(\d+\s*X\s*20[\'\’\″\”\"]?\s*FCL[\s\S]*?Container\s*&\s*Seal\s*nos\.?\s*:\s*[\s\S]*?)(?:INDIAN|HS\s*CODE|Description|NO\.|$)', _FLAGS)
+_SIMPLE_FCL_RE = re.compile(r'(\d+\s*X\s*20[\'\’\″\”\"]?\s*FCL[^\n]*?)', _FLAGS)
+_FCL_TOKEN_RE = re.compile(r'(\d+\s*X\s*20[\'\’\″\”\"]?\s*FCL)', re.IGNORECASE)
+# sr_marks line filters: any-of alternations instead of one search per pattern
+_SR_ALLOWED_RE = re.compile(r'\bFCL\b|Container|Seal|Marks|Packages?|Pkg|Cartons?|\bNo\.?', re.IGNORECASE)
+_SR_PRODUCT_RE = re.compile(r'\bICUMSA\b|PACK|NET\s*WEIGHT|TOTAL|GROSS|HS\s*CODE|\bKGS?\b|\bMTS?\b|BAGS?|PP\s*BAGS|PACKED|WEIGHT', re.IGNORECASE)
+_HS_ONLY_RE = re.compile(r'HS\s*CODE\s*[:\-]?\s*([0-9\.]{6,10})', _FLAGS)
+_DESC_AFTER_HS_RE = re.compile(
+    r'HS\s*CODE\s*[:\-]?\s*[0-9\.]{6,10}\s*([\s\S]{0,3000}?)(?:TOTAL\s*NET\s*WEIGHT|TOTAL\s*GROSS\s*WEIGHT|Amount\s*Chargeable|BIN\s*NO|DECLARATION|RATE\s*PER|NO\.?\s*OF|$)',
+    _FLAGS
+)
+_PRE_HS_LINE_RE = re.compile(r'([^\r\n]{8,240})\s*\r?\n\s*HS\s*CODE', _FLAGS)
+_PRE_HS_RE = re.compile(r'([^\r\n]{8,240})\s*HS\s*CODE', _FLAGS)
+
+# Every HS CODE label with its separator and value, found once per invoice; the goods rows
+# then slice raw around these spans instead of compiling a pattern per row
+_HS_SPAN_RE = re.compile(r'HS\s*CODE\s*([:\-]?)\s*([0-9.]+)', _FLAGS)
+_QUANTITY_RE = re.compile(r'QUANTITY', _FLAGS)
+
+def _text_before(raw: str, start: int, same_line: bool):
+    """(offset, text) of the last non-blank line before an HS CODE label, capped at 240 chars; None if too short."""
+    end = start
+    while end and raw[end - 1].isspace():  # str.isspace() is exactly what \s matches
+        end -= 1
+    line_end = start
+    for nl in ("\r", "\n"):
+        i = raw.find(nl, end, line_end)
+        if i != -1:
+            line_end = i
+    if not same_line and line_end == start:
+        return None  # the label shares a line with the text
+    line_start = max(raw.rfind("\r", 0, end), raw.rfind("\n", 0, end)) + 1
+    begin = max(line_start, end - 240)
+    if line_end - begin < 8:
+        return None
+    return begin, raw[begin:end].strip()
+
+def _hs_context(raw: str, spans: list, hs: str):
+    """(pre_hs_name, desc_raw) for a goods row: the product line before its HS CODE and the text up to QUANTITY."""
+    desc_raw = ""
+    for start, sep, value_start in spans:
+        if sep == ":" and raw.startswith(hs, value_start):
+            end = value_start + len(hs)
+            q = _QUANTITY_RE.search(raw, end)
+            if q:
+                desc_raw = raw[end:q.start()].strip()
+            break
+    matching = [start for start, _sep, value_start in spans if raw.startswith(hs, value_start)]
+    # a label on its own line wins over one sharing a line with the product text; like the
+    # leftmost-greedy search this replaces, the earliest text start wins, then the later label
+    for same_line in (False, True):
+        found = [hit for hit in (_text_before(raw, start, same_line) for start in matching) if hit]
+        if found:
+            begin = min(b for b, _name in found)
+            return [name for b, name in found if b == begin][-1], desc_raw
+    return "", desc_raw
+
+@dataclass(slots=True)
+class GoodsRow:
+    """One goods line of the invoice; slotted, so rows carry no per-instance dict."""
+    hs_code: str = ""
+    description: str = ""
+    quantity: str = ""
+    weight: str = ""
+    packing: str = ""
+    unit: str = ""
+    rate: str = ""
+    amount: str = ""
+    units_mt: str = ""
+    weight_measurements: str = ""
+    description_full_fallback: str | None = None  # only on the row built by the layout fallback
+    sr_marks: str = ""
+
+    def to_dict(self) -> dict:
+        """JSON shape of the row, as the goods dicts had it."""
+        row = asdict(self)
+        if self.description_full_fallback is None:
+            del row["description_full_fallback"]
+        return row
+
+    @classmethod
+    def from_dict(cls, row: dict) -> "GoodsRow":
+        """Row from a goods dict (e.g. one /generate-bl-json/ returned); unknown keys are ignored."""
+        return cls(**{f: row[f] for f in cls.__slots__ if f in row})
+
+# Union of label starters that end a multi-line block (exporter, consignee, ports...).
+# Zero-width so finditer() reports every position a label begins, overlaps included.
+_LABEL_ALTS = [
+    r'Invoice\s*No\.?', r'I\.?E\.?\s*Code', r"Buyer'?s\s*Order\s*No\.",
+    r'Consignee', r'Notify\s*Party', r'Country', r'Pre-?Carriage', r'Vessel\s*\/?\s*Voyage',
+    r'Place\s*of\s*Receipt', r'Port\s*of\s*Loading', r'Port\s*of\s*Discharge', r'Final\s*Destination',
+    r'Terms\s*of\s*Payment', r'Amount\s*Chargeable', r'Total', r'BIN\s*NO', r'Drawback', r'Benefit', r'Shipment'
+]
+_BOUNDARY_RE = re.compile(r'(?=' + r'|'.join(_LABEL_ALTS) + r')', _FLAGS)
+
+def _compile_label_db():
+    """Hyperscan database of _LABEL_ALTS, or None when hyperscan is unavailable."""
+    if hyperscan is None:
+        return None
+    # Python's str \s also matches the \x1c-\x1f separators; keep the offsets identical
+    exprs = [alt.replace(r'\s', r'[\s\x1c-\x1f]').encode() for alt in _LABEL_ALTS]
+    try:
+        db = hyperscan.Database()
+        db.compile(expressions=exprs, ids=list(range(len(exprs))), elements=len(exprs),
+                   flags=hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SOM_LEFTMOST)
+    except hyperscan.error:
+        return None
+    return db
+
+_LABEL_DB = _compile_label_db()
+_LABEL_SCRATCH = threading.local()  # hyperscan scratch space must not be shared across threads
+
+def _label_starts(raw: str) -> list:
+    """Sorted offsets at which any boundary label begins."""
+    # byte offsets only equal str offsets (and caseless matching only agrees with re) for ASCII
+    if _LABEL_DB is None or not raw.isascii():
+        return [m.start() for m in _BOUNDARY_RE.finditer(raw)]
+    scratch = getattr(_LABEL_SCRATCH, "scratch", None)
+    if scratch is None:
+        scratch = _LABEL_SCRATCH.scratch = hyperscan.Scratch(_LABEL_DB)
+    starts = set()
+    _LABEL_DB.scan(raw.encode(), match_event_handler=lambda _id, start, _end, _flags, _ctx: starts.add(start),
+                   scratch=scratch)
+    return sorted(starts)
+
+# extract_block label regex -> compiled "label + separator" pattern, built on first use
+_BLOCK_LABEL_CACHE = {}
+
+# Leading 'Notify Party' label(s) inside the consignee block: one pass covering both the
+# 'Notify Party:' form and a following 'Notify Party -' label the old second sub() caught
+_NOTIFY_LABEL_RE = re.compile(r'^Notify\s*Party\s*:?\s*(?:Notify\s*Party\s*[:\-]?\s*)?', re.IGNORECASE | re.MULTILINE)
+
+# Byte -> character maps: one os.urandom() call plus translate() builds a whole
+# placeholder identifier instead of one RNG call per character
+_LETTER_TABLE = bytes(string.ascii_uppercase.encode()[b % 26] for b in range(256))
+_DIGIT_TABLE = bytes(string.digits.encode()[b % 10] for b in range(256))
+
+def random_container_no() -> str:
+    """Placeholder container number: 4 letters + 7 digits."""
+    return (os.urandom(4).translate(_LETTER_TABLE) + os.urandom(7).translate(_DIGIT_TABLE)).decode()
+
+def random_seal_no() -> str:
+    """Placeholder seal number: 6 digits."""
+    return os.urandom(6).translate(_DIGIT_TABLE).decode()
+
+def _parse_invoice_text(text: str) -> dict:
+    """Regex extraction proper. Deterministic in its input, so results can be cached."""
     raw = text or ""
-    FLAGS = re.IGNORECASE | re.DOTALL
+
+    present = _present_anchors(raw)
 
     # Use the raw text for matching
-    def find(pattern: str, source: str = None):
+    def find(pattern: re.Pattern, source: str = None):
+        if source is None and present is not None:
+            anchors = _FIELD_ANCHORS.get(pattern)
+            if anchors and present.isdisjoint(anchors):
+                return ""  # anchor word absent: the pattern cannot match
         s = raw if source is None else source
-        m = re.search(pattern, s, FLAGS)
+        m = pattern.search(s)
         try:
             return (m.group(1) or "").strip() if m else ""
         except Exception:
             return ""
 
-    def extract_block(label_regex: str, next_labels_regex: str, source: str = None) -> str:
-        s = raw if source is None else source
-        pattern = rf'{label_regex}\s*[:\-]?\s*(.*?)(?={next_labels_regex}|$)'
-        m = re.search(pattern, s, FLAGS)
-        block = (m.group(1) or "").strip() if m else ""
+    # Single pass over the text: offsets of every label starter. Blocks are then
+    # sliced up to the next label instead of re-scanning with a lookahead each time.
+    label_starts = _label_starts(raw)
+
+    def extract_block(label_regex: str) -> str:
+        # trailing empty group tells us whether the value part of the pattern matched
+        pat = _BLOCK_LABEL_CACHE.get(label_regex)
+        if pat is None:
+            pat = _BLOCK_LABEL_CACHE[label_regex] = re.compile(rf'{label_regex}\s*[:\-]?\s*()', _FLAGS)
+        m = pat.search(raw)
+        if not m or m.group(1) is None:
+            return ""
+        start = m.end()
+        i = bisect_left(label_starts, start)
+        end = label_starts[i] if i < len(label_starts) else len(raw)
+        block = raw[start:end].strip()
         # restore line breaks where multiple spaces may exist
-        block = re.sub(r'\n\s*', '\n', block)
+        block = _LINE_INDENT_RE.sub('\n', block)
         return block
 
-    # Build a union of label starters for lookahead boundaries
-    label_alts = [
-        r'Invoice\s*No\.?', r'I\.?E\.?\s*Code', r"Buyer'?s\s*Order\s*No\.",
-        r'Consignee', r'Notify\s*Party', r'Country', r'Pre-?Carriage', r'Vessel\s*\/?\s*Voyage',
-        r'Place\s*of\s*Receipt', r'Port\s*of\s*Loading', r'Port\s*of\s*Discharge', r'Final\s*Destination',
-        r'Terms\s*of\s*Payment', r'Amount\s*Chargeable', r'Total', r'BIN\s*NO', r'Drawback', r'Benefit', r'Shipment'
-    ]
-    boundary = r'(?=' + r'|'.join(label_alts) + r')'
-
     # 🧾 BASIC DETAILS
-    invoice_no = find(r'Invoice\s*No\.?\s*[:\-]?\s*([A-Z0-9\-\/]+)')
-    ie_code = find(r'I\.?E\.?\s*Code\s*No\.?\s*[:\-]?\s*([A-Z0-9]+)')
-    po_no = find(r'Buyer.?s\s*Order\s*No\.?\s*[:\-]?\s*([A-Z0-9\-\/]+)')
-    terms = find(r'Terms\s*of\s*Payment\s*[:\-]?\s*(.+?)(?:Country|Final|Port|$)')
-    drawback_no = find(r'Drawback\s*Sr\.?\s*No\.?\s*[:\-]?\s*([A-Z0-9\-\/]+)')
-    benefit_scheme = find(r'Benefit[s]?\s*under\s*ME[I|E]S\s*scheme\s*[:\-]?\s*([A-Za-z ]+)')
-    total = find(r'(?:Amount\s*Chargeable|Total)\s*[:\-]?\s*(?:USD\s*)?([\d,]+(?:\.\d{2})?)')
-    currency = "USD" if re.search(r'USD', raw, re.IGNORECASE) else "NOT FOUND"
+    invoice_no = find(_INVOICE_NO_RE)
+    ie_code = find(_IE_CODE_RE)
+    po_no = find(_PO_NO_RE)
+    terms = find(_TERMS_RE)
+    drawback_no = find(_DRAWBACK_NO_RE)
+    benefit_scheme = find(_BENEFIT_SCHEME_RE)
+    total = find(_TOTAL_RE)
+    currency = "USD" if _USD_RE.search(raw) else "NOT FOUND"
 
     # 🏢 EXPORTER / CONSIGNEE / NOTIFY PARTY (multiline blocks)
     # Shipper is same as Exporter
-    exporter_block = extract_block(r'Exporter|Shipper', boundary)
-    consignee_block = extract_block(r'Consignee', boundary)
-    notify_block = extract_block(r'Notify\s*Party', boundary)
+    exporter_block = extract_block(r'Exporter|Shipper')
+    consignee_block = extract_block(r'Consignee')
+    notify_block = extract_block(r'Notify\s*Party')
 
     # Fallbacks: if blocks are empty, try broader spans between common labels
     if not exporter_block:
-        m = re.search(r'(?:Exporter|Shipper)\s*:\s*([\s\S]{10,800}?)(?=Consignee|Notify\s*Party|Invoice\s*No\.?|Country|Pre-?Carriage|$)', raw, FLAGS)
+        m = _EXPORTER_SPAN_RE.search(raw)
         exporter_block = (m.group(1).strip() if m else "")
     if not consignee_block:
-        m = re.search(r'Consignee\s*:\s*([\s\S]{10,800}?)(?=Notify\s*Party|Country|Pre-?Carriage|Invoice\s*No\.?|$)', raw, FLAGS)
+        m = _CONSIGNEE_SPAN_RE.search(raw)
         consignee_block = (m.group(1).strip() if m else "")
         # Additional fallback for consignee
         if not consignee_block:
-            m = re.search(r'Consignee\s*[:\-]?\s*([\s\S]{10,500}?)(?=Notify|Country|Port|Vessel|$)', raw, FLAGS)
+            m = _CONSIGNEE_LOOSE_RE.search(raw)
             consignee_block = (m.group(1).strip() if m else "")
 
 
@@ -106,59 +517,52 @@ def extract_invoice_data(text: str) -> dict:
     exporter_name = ""
     exporter_address = ""
     if exporter_block:
-        lines = [ln.strip() for ln in re.split(r'[\r\n]+', exporter_block) if ln.strip()]
+        lines = [ln.strip() for ln in _LINES_RE.split(exporter_block) if ln.strip()]
         if lines:
             # pick first candidate that looks like a company (not 'INVOICE')
             candidate = None
             for ln in lines:
-                if re.search(r'Invoice|Bill\s*of\s*Lading|B/L|Date|Tax|GST', ln, re.IGNORECASE):
+                if _NON_NAME_LINE_RE.search(ln):
                     continue
                 candidate = ln
                 break
             if not candidate:
                 candidate = lines[0]
-            exporter_name = re.sub(r'(?mi)^(?:Exporter|Shipper)\s*:?\s*', '', candidate).strip()
+            exporter_name = _EXPORTER_LABEL_RE.sub('', candidate).strip()
             exporter_address = "\n".join([l for l in lines if l != candidate]).strip()
 
     # If exporter name is missing or is a generic placeholder, try to extract from top of document
     if not exporter_name or exporter_name.strip().lower() in ('invoice', 'exporter', 'shipper', 'seller'):
-        m = re.search(r'^(.*?)(?=\n\s*(?:Consignee|Notify\s*Party|Invoice\s*No\.?|I\.?E\.?\s*Code|$))', raw, re.IGNORECASE | re.DOTALL)
+        m = _TOP_BLOCK_RE.search(raw)
         if m:
             top_block = m.group(1).strip()
-            top_lines = [ln.strip() for ln in re.split(r'[\r\n]+', top_block) if ln.strip()]
+            top_lines = [ln.strip() for ln in _LINES_RE.split(top_block) if ln.strip()]
             for ln in top_lines:
-                if len(ln) > 2 and not re.search(r'Invoice|Bill\s*of\s*Lading|B/L|Date', ln, re.IGNORECASE):
+                if len(ln) > 2 and not _TOP_HEADING_RE.search(ln):
                     exporter_name = exporter_name or ln
                     # set remaining as address
                     rest = [l for l in top_lines if l != ln]
                     exporter_address = exporter_address or "\n".join(rest).strip()
                     break
-        exporter_block = re.sub(r'(?mi)^.*\bI\.?E\.?\s*Code.*$\n?', '', exporter_block)
-        # Remove Invoice No / Buyer's Order No lines if accidentally captured
-        exporter_block = re.sub(r'(?mi)^.*\bInvoice\s*No\.?\b.*$\n?', '', exporter_block)
-        exporter_block = re.sub(r"(?mi)^.*Buyer'?s\s*Order\s*No\.?\b.*$\n?", '', exporter_block)
-        # Remove leading 'Exporter:'/'Shipper:' labels if present
-        exporter_block = re.sub(r'(?mi)^(?:Exporter|Shipper)\s*:?\s*', '', exporter_block)
-        # Collapse excessive blank lines
-        exporter_block = re.sub(r'\n{3,}', '\n\n', exporter_block)
-        exporter_block = exporter_block.strip()
+        # Remove I.E. Code / Invoice No / Buyer's Order No lines if accidentally captured and
+        # leading 'Exporter:'/'Shipper:' labels, then collapse excessive blank lines
+        exporter_block = _BLANK_LINES_RE.sub('\n\n', _EXPORTER_STRIP_RE.sub('', exporter_block)).strip()
 
         # Remove plain PO lines like 'PO-123456' which sometimes appear in exporter block
         if exporter_block:
-            exporter_block = re.sub(r'(?mi)^\s*PO[-\s]*\d+\b.*$\n?', '', exporter_block)
+            exporter_block = _PO_LINE_RE.sub('', exporter_block)
             exporter_block = exporter_block.strip()
 
     # --- Split exporter block into name + address for structured output ---
     exporter_name = ""
     exporter_address = ""
     if exporter_block:
-        lines = [ln.strip() for ln in re.split(r'[\r\n]+', exporter_block) if ln.strip()]
+        lines = [ln.strip() for ln in _LINES_RE.split(exporter_block) if ln.strip()]
         if lines:
             # Prefer a company-like line (contains company tokens or uppercase short name)
-            company_token = re.compile(r'\b(IMPEX|PVT|LTD|LLP|LLC|TRADING|EXPORTS|IMPORTS|CO\.|COMPANY|INDIA)\b', re.IGNORECASE)
             candidate = None
             for ln in lines:
-                if company_token.search(ln) or re.match(r'^[A-Z0-9 &,\-\.]{{3,}}$', ln):
+                if _COMPANY_TOKEN_RE.search(ln) or _CAPS_NAME_RE.match(ln):
                     candidate = ln
                     break
             # if none found, prefer a short non-address first line
@@ -181,18 +585,18 @@ def extract_invoice_data(text: str) -> dict:
     # If exporter_name is missing or appears to be an address (e.g. starts with 'Plot', contains 'GIDC' or long numeric address),
     # try a fallback: take the top-of-document block until common labels (Consignee/Notify/Invoice) and use its first line as name.
     def looks_like_address(s: str) -> bool:
-        return bool(re.search(r'\bPlot\b|\bGIDC\b|\bIndustrial\b|\bEstate\b|\bPhase\b|\bIndia\b|\d{3,}', s, re.IGNORECASE))
+        return bool(_ADDRESS_HINT_RE.search(s))
 
     if not exporter_name or looks_like_address(exporter_name):
         top_block = ""
-        m_top = re.search(r'^(.*?)(?=\bConsignee\b|\bNotify\s*Party\b|\bInvoice\s*No\.?|\bBuyer\'?s\s*Order\b|\bCountry\b)', raw, FLAGS)
+        m_top = _TOP_UNTIL_LABEL_RE.search(raw)
         if m_top:
             top_block = m_top.group(1).strip()
         # Clean common headings from the top block
         if top_block:
-            top_lines = [ln.strip() for ln in re.split(r'[\r\n]+', top_block) if ln.strip()]
+            top_lines = [ln.strip() for ln in _LINES_RE.split(top_block) if ln.strip()]
             # remove leading labels/headings if present
-            if top_lines and re.search(r'^(Exporter|Shipper|INVOICE|BILL|TAX)', top_lines[0], re.IGNORECASE):
+            if top_lines and _HEADING_PREFIX_RE.search(top_lines[0]):
                 # drop obvious heading line
                 top_lines = top_lines[1:]
 
@@ -201,11 +605,10 @@ def extract_invoice_data(text: str) -> dict:
                 if not s or len(s) < 3:
                     return False
                 # exclude very generic single words
-                deny = [r'INVOICE', r'BILL', r'TAX', r'GST', r'AMOUNT', r'DATE']
-                if any(re.search(d, s, re.IGNORECASE) for d in deny):
+                if _DENY_WORD_RE.search(s):
                     return False
                 # must contain letters and at least one space (two words) and not look like an address
-                if re.search(r'[A-Za-z]', s) and len(s.split()) >= 1 and not looks_like_address(s):
+                if _HAS_LETTER_RE.search(s) and len(s.split()) >= 1 and not looks_like_address(s):
                     # prefer shortish company-like lines
                     return len(s) <= 80
                 return False
@@ -222,33 +625,33 @@ def extract_invoice_data(text: str) -> dict:
             if candidate:
                 exporter_name = candidate
                 # exporter_address: remaining top lines excluding the chosen candidate and any heading-like lines
-                remaining = [ln for ln in top_lines if ln != candidate and not re.search(r'^(Exporter|Shipper|INVOICE|BILL|TAX)', ln, re.IGNORECASE)]
+                remaining = [ln for ln in top_lines if ln != candidate and not _HEADING_PREFIX_RE.search(ln)]
                 exporter_address = exporter_address or "\n".join(remaining).strip()
 
     # Extra fallback: sometimes OCR/text layouts put a standalone 'INVOICE' or other heading first.
     # If exporter_name is still missing or equals 'INVOICE', scan the raw text before 'Consignee' for a company-like line.
-    if not exporter_name or re.search(r'INVOICE', exporter_name, re.IGNORECASE):
+    if not exporter_name or _INVOICE_WORD_RE.search(exporter_name):
         pre_cons_block = raw
-        m_cons = re.search(r'(.*?)(?=\bConsignee\b|\bNotify\s*Party\b|\bInvoice\s*No\.?|\bBuyer\'??s\s*Order\b)', raw, FLAGS)
+        m_cons = _PRE_CONSIGNEE_RE.search(raw)
         if m_cons:
             pre_cons_block = m_cons.group(1)
         candidate = None
-        for ln in [l.strip() for l in re.split(r'[\r\n]+', pre_cons_block) if l.strip()]:
+        for ln in [l.strip() for l in _LINES_RE.split(pre_cons_block) if l.strip()]:
             # skip generic headings
-            if re.search(r'^(INVOICE|BILL|TAX|STATEMENT)$', ln, re.IGNORECASE):
+            if _GENERIC_HEADING_RE.search(ln):
                 continue
             # prefer lines containing common company tokens or uppercase style
-            if re.search(r'\b(IMPEX|PVT|LTD|LLC|COMPANY|TRADING|EXPORTS|IMPORTS|INDIA|GMBH)\b', ln, re.IGNORECASE) or re.match(r'^[A-Z0-9 &,\-\.]{3,}$', ln):
+            if _COMPANY_WORD_RE.search(ln) or _CAPS_LINE_RE.match(ln):
                 candidate = ln
                 break
             # Title-case company name (like 'Shraddha Impex')
-            if re.match(r'^[A-Z][a-z]+(\s+[A-Z][a-z]+)+', ln):
+            if _TITLE_CASE_RE.match(ln):
                 candidate = ln
                 break
         if candidate:
             exporter_name = candidate
             # build address from lines after candidate
-            all_lines = [l.strip() for l in re.split(r'[\r\n]+', pre_cons_block) if l.strip()]
+            all_lines = [l.strip() for l in _LINES_RE.split(pre_cons_block) if l.strip()]
             try:
                 idx = all_lines.index(candidate)
                 exporter_address = exporter_address or "\n".join(all_lines[idx+1:]).strip()
@@ -258,14 +661,14 @@ def extract_invoice_data(text: str) -> dict:
     # FINAL FALLBACK: search anywhere in raw for a company-like token (IMPEX/PVT/LTD/LLC/TRADING)
     # This helps when earlier block parsing misses a top-line company name.
     if not exporter_name:
-        company_match = re.search(r'^(.*(?:IMPEX|PVT|LTD|LLP|LLC|TRADING|EXPORTS|IMPORTS|COMPANY|CO\.)[^\n]*)$', raw, re.IGNORECASE | re.MULTILINE)
+        company_match = _COMPANY_LINE_RE.search(raw)
         if company_match:
             candidate = company_match.group(1).strip()
             # avoid accidental headings
-            if not re.search(r'^(INVOICE|BILL|TAX)$', candidate, re.IGNORECASE):
+            if not _BARE_HEADING_RE.search(candidate):
                 exporter_name = candidate
                 # try to set exporter_address from nearby lines (lines following the candidate)
-                all_lines = [l.strip() for l in re.split(r'[\r\n]+', raw) if l.strip()]
+                all_lines = [l.strip() for l in _LINES_RE.split(raw) if l.strip()]
                 try:
                     idx = all_lines.index(candidate)
                     exporter_address = exporter_address or "\n".join(all_lines[idx+1:idx+5]).strip()
@@ -274,19 +677,19 @@ def extract_invoice_data(text: str) -> dict:
 
     # EXTRA: if still not found, try a simple labeled 'Exporter:' line (common layouts)
     if not exporter_name:
-        m = re.search(r'Exporter\s*[:\-]?\s*(.+)', raw, re.IGNORECASE)
+        m = _EXPORTER_LINE_RE.search(raw)
         if m:
             candidate = m.group(1).strip().split('\n')[0].strip()
-            if candidate and not re.search(r'^(INVOICE|BILL|TAX)$', candidate, re.IGNORECASE):
+            if candidate and not _BARE_HEADING_RE.search(candidate):
                 exporter_name = candidate
                 # try to set exporter_address from the exporter_block if present
                 if exporter_block and not exporter_address:
-                    lines = [ln.strip() for ln in re.split(r'[\r\n]+', exporter_block) if ln.strip()]
+                    lines = [ln.strip() for ln in _LINES_RE.split(exporter_block) if ln.strip()]
                     if lines and lines[0] == candidate:
                         exporter_address = "\n".join(lines[1:]).strip()
 
     # Notify Party: mirror Consignee if missing or marked same as consignee
-    if (not notify_block or re.search(r'same as consignee', notify_block, re.IGNORECASE)):
+    if (not notify_block or _SAME_AS_CONSIGNEE_RE.search(notify_block)):
         notify_block = consignee_block
 
     # Use notify party data for consignee if consignee is empty
@@ -295,31 +698,42 @@ def extract_invoice_data(text: str) -> dict:
 
     # Remove embedded 'Notify Party' labels inside consignee block (we already have a CONSIGNEE header)
     if consignee_block:
-        consignee_block = re.sub(r'(?mi)^Notify\s*Party\s*:?\s*', '', consignee_block)
-        consignee_block = re.sub(r'(?mi)^Notify\s*Party\s*[:\-]?\s*', '', consignee_block)
+        consignee_block = _NOTIFY_LABEL_RE.sub('', consignee_block)
 
     # 🚢 SHIPMENT DETAILS
-    pre_carriage = find(r'(?:Pre|Pre\-)?\s*Carriage\s*By\s*[:\-]?\s*([A-Za-z \-]+)') or find(r'Pre\-?Carriage\s*[:\-]?\s*([A-Za-z \-]+)')
-    vessel_voyage = find(r'Vessel\s*\/?\s*Voyage\s*[:\-]?\s*([A-Za-z0-9 .\-\/]+)')
+    pre_carriage = find(_CARRIAGE_BY_RE) or find(_PRE_CARRIAGE_RE)
+    vessel_voyage = ""
+    vessel_match = _VESSEL_VOYAGE_RE.search(raw)
+    if vessel_match:
+        # the value ends at the next label on its row ('MSC LORETO V.123A Port of Loading')
+        start, end = vessel_match.span(1)
+        i = bisect_left(label_starts, start)
+        if i < len(label_starts):
+            end = min(end, label_starts[i])
+        vessel_voyage = raw[start:end]
+        label_match = _SHIPMENT_LABEL_RE.search(vessel_voyage)
+        if label_match:
+            vessel_voyage = vessel_voyage[:label_match.start()]
+        vessel_voyage = vessel_voyage.strip()
     # Use block extraction for all four header fields with robust lookahead boundaries
-    por_block = extract_block(r'Place\s*of\s*receipt|Place\s*of\s*Acceptance', boundary)
-    pl_block = extract_block(r'Port\s*of\s*Loading|Port\s*of\s*Shipment', boundary)
-    pd_block = extract_block(r'Port\s*of\s*Discharge', boundary)
-    podl_block = extract_block(r'Place\s*of\s*Delivery|Final\s*Destination', boundary)
+    por_block = extract_block(r'Place\s*of\s*receipt|Place\s*of\s*Acceptance')
+    pl_block = extract_block(r'Port\s*of\s*Loading|Port\s*of\s*Shipment')
+    pd_block = extract_block(r'Port\s*of\s*Discharge')
+    podl_block = extract_block(r'Place\s*of\s*Delivery|Final\s*Destination')
     # Specific regex patterns for known ports (use capturing groups so finder returns value)
     pol_direct = (
-        find(r'(Nhava\s*Sheva|Nava\s*Sheva|Nahava\s*Seva|JNPT)') or
-        find(r'Port\s*of\s*Loading\s*[:\-]?\s*([^\n]+)') or 
-        find(r'Port\s*of\s*Shipment\s*[:\-]?\s*([^\n]+)') or
-        find(r'Loading\s*Port\s*[:\-]?\s*([^\n]+)') or
-        find(r'POL\s*[:\-]?\s*([^\n]+)')
+        find(_POL_KNOWN_RE) or
+        find(_PORT_OF_LOADING_RE) or 
+        find(_PORT_OF_SHIPMENT_RE) or
+        find(_LOADING_PORT_RE) or
+        find(_POL_RE)
     )
     pod_direct = (
-        find(r'(Singapore)') or
-        find(r'Port\s*of\s*Discharge\s*[:\-]?\s*([^\n]+)') or 
-        find(r'Port\s*of\s*Delivery\s*[:\-]?\s*([^\n]+)') or
-        find(r'Discharge\s*Port\s*[:\-]?\s*([^\n]+)') or
-        find(r'POD\s*[:\-]?\s*([^\n]+)')
+        find(_POD_KNOWN_RE) or
+        find(_PORT_OF_DISCHARGE_RE) or 
+        find(_PORT_OF_DELIVERY_RE) or
+        find(_DISCHARGE_PORT_RE) or
+        find(_POD_RE)
     )
     def first_line(val: str) -> str:
         if not val:
@@ -329,98 +743,80 @@ def extract_invoice_data(text: str) -> dict:
             if s:
                 return s
         return ''
-    place_receipt = (first_line(por_block) or find(r'(?:Place|Place\s*of)\s*of?\s*Receipt\s*[:\-]?\s*([^\n]+)') or find(r'Place\s*of\s*Acceptance\s*[:\-]?\s*([^\n]+)'))
+    place_receipt = (first_line(por_block) or find(_PLACE_OF_RECEIPT_RE) or find(_PLACE_OF_ACCEPTANCE_RE))
     port_loading = (pol_direct or first_line(pl_block))
     port_discharge = (pod_direct or first_line(pd_block))
-    final_destination = (first_line(podl_block) or find(r'Final\s*Destination\s*[:\-]?\s*([^\n]+)') or find(r'Place\s*of\s*Delivery\s*[:\-]?\s*([^\n]+)'))
-    country_origin = find(r'Country\s*of\s*Origin\s*[:\-]?\s*([A-Za-z ,]+)')
-    country_destination = find(r'Country\s*of\s*Final\s*Destination\s*[:\-]?\s*([A-Za-z ,]+)')
+    final_destination = (first_line(podl_block) or find(_FINAL_DESTINATION_RE) or find(_PLACE_OF_DELIVERY_RE))
+    country_origin = find(_COUNTRY_OF_ORIGIN_RE)
+    country_destination = find(_COUNTRY_OF_DESTINATION_RE)
     # Container & Seal (fallback from raw text)
-    cont_seal_match = re.search(r'Container\s*&\s*Seal\s*nos?\.?\s*[:\-]?\s*([A-Z0-9\/\-]+)\s*[\/\-\| ]\s*([A-Z0-9]+)', raw, FLAGS)
+    container_no = seal_no = ""
+    cont_seal_match = _CONTAINER_SEAL_RE.search(raw)
     if cont_seal_match:
-        container_no = cont_seal_match.group(1).strip()
-        seal_no = cont_seal_match.group(2).strip()
+        if _CONTAINER_NO_RE.fullmatch(cont_seal_match.group(1)):
+            container_no = cont_seal_match.group(1)
+        if _SEAL_NO_RE.fullmatch(cont_seal_match.group(2)):
+            seal_no = cont_seal_match.group(2)
 
     # 📦 GOODS EXTRACTION
-    goods_matches = re.findall(
-        r'HS\s*CODE\s*:\s*([0-9\.]+)[\s\S]*?QUANTITY\s*:\s*([0-9,]+\s*PCS)[\s\S]*?WEIGHT\s*:\s*([0-9,\.]+\s*KGS?)[\s\S]*?PACKING\s*:\s*([0-9,]+\s*CARTONS?)',
-        text, FLAGS
-    )
+    goods_matches = _GOODS_RE.findall(text)
 
     goods = []
     # Attempt to capture Sr No & Marks / Containers block (optional)
-    sr_marks_block_match = re.search(r'(\d+\s*X\s*20[\'\’\″\”\"]?\s*FCL[\s\S]*?Container\s*&\s*Seal\s*nos\.?\s*:\s*[\s\S]*?)(?:INDIAN|HS\s*CODE|Description|NO\.|$)', raw, FLAGS)
+    sr_marks_block_match = _SR_MARKS_RE.search(raw)
     sr_marks_block = sr_marks_block_match.group(1).strip() if sr_marks_block_match else ""
     # If not found, try a simpler pattern like "06 X 20' FCL ..."
     if not sr_marks_block:
-        simple_fcl = re.search(r'(\d+\s*X\s*20[\'\’\″\”\"]?\s*FCL[^\n]*?)', raw, FLAGS)
+        simple_fcl = _SIMPLE_FCL_RE.search(raw)
         if simple_fcl:
             sr_marks_block = simple_fcl.group(1).strip()
     # If still not found but container/seal extracted, compose sr_marks text
-    if not sr_marks_block and (locals().get('container_no') and locals().get('seal_no')):
+    if not sr_marks_block and (container_no and seal_no):
         sr_marks_block = f"Container & Seal nos.: {container_no} / {seal_no}"
     # Clean sr_marks to avoid product/description lines leaking into left column
     if sr_marks_block:
-        sr_lines = [ln.strip() for ln in re.split(r'[\r\n]+', sr_marks_block) if ln.strip()]
-        allowed_patterns = [r'\bFCL\b', r'Container', r'Seal', r'Marks', r'Packages?', r'Pkg', r'Cartons?', r'\bNo\.?']
-        def is_allowed(line: str) -> bool:
-            return any(re.search(p, line, re.IGNORECASE) for p in allowed_patterns)
+        sr_lines = [ln.strip() for ln in _LINES_RE.split(sr_marks_block) if ln.strip()]
         sr_filtered = []
-        # Exclude product/description-like lines (ICUMSA, PACKED, NET WEIGHT, HS CODE, measurements etc.)
-        product_exclude_patterns = [r'\bICUMSA\b', r'PACK', r'NET\s*WEIGHT', r'TOTAL', r'GROSS', r'HS\s*CODE', r'\bKGS?\b', r'\bMTS?\b', r'BAGS?', r'PP\s*BAGS', r'PACKED', r'WEIGHT']
-        def is_product_line(line: str) -> bool:
-            return any(re.search(p, line, re.IGNORECASE) for p in product_exclude_patterns)
-
         for ln in sr_lines:
             # skip lines that clearly look like product descriptions or measurements
-            if is_product_line(ln):
+            # (ICUMSA, PACKED, NET WEIGHT, HS CODE, measurements etc.)
+            if _SR_PRODUCT_RE.search(ln):
                 continue
             # capture FCL counts like '06 X 20' FCL' as compact token
-            if re.search(r'\d+\s*X\s*20[\'\’\″\”\"]?\s*FCL', ln, re.IGNORECASE):
-                m = re.search(r'(\d+\s*X\s*20[\'\’\″\”\"]?\s*FCL)', ln, re.IGNORECASE)
-                if m:
-                    sr_filtered.append(m.group(1))
+            m = _FCL_TOKEN_RE.search(ln)
+            if m:
+                sr_filtered.append(m.group(1))
                 continue
-            if is_allowed(ln):
+            if _SR_ALLOWED_RE.search(ln):
                 sr_filtered.append(ln)
         # If filtering removed everything but container/seal exists, ensure container & seal line remains
-        if not sr_filtered and (locals().get('container_no') and locals().get('seal_no')):
+        if not sr_filtered and (container_no and seal_no):
             sr_filtered = [f"Container & Seal nos.: {container_no} / {seal_no}"]
         sr_marks_block = "\n".join(sr_filtered).strip()
 
     # Capture Units (In Metric Tons), Rate Per Unit (USD), Amount (USD) from headers if present
-    units_mt = find(r'NO\.\s*OF\s*UNITS\s*\(In\s*Metric\s*Tons\)\s*([0-9,.]+)')
+    units_mt = find(_UNITS_MT_RE)
     if units_mt == "NOT FOUND":
         # fallback to NET WEIGHT value in MTS
-        units_mt = find(r'TOTAL\s*NET\s*WEIGHT\s*[:\-]?\s*([0-9,.]+)\s*MTS?')
+        units_mt = find(_NET_WEIGHT_MT_RE)
 
-    rate_per_unit = find(r'RATE\s*PER\s*UNIT\s*\(USD\)\s*([0-9,.]+)')
-    amount_usd = find(r'Amount\s*\(USD\)\s*([0-9,.]+)')
-    total_net_wt = find(r'TOTAL\s*NET\s*WEIGHT\s*[:\-]?\s*([0-9,.]+)\s*(?:MTS?|KGS?)')
-    total_gross_wt = find(r'TOTAL\s*GROSS\s*WEIGHT\s*[:\-]?\s*([0-9,.]+)\s*(?:MTS?|KGS?)')
-    measurement_cbm = find(r'MEASUREMENT\s*[:\-]?\s*([0-9,.]+\s*CBM)')
+    rate_per_unit = find(_RATE_PER_UNIT_RE)
+    amount_usd = find(_AMOUNT_USD_RE)
+    total_net_wt = find(_TOTAL_NET_WT_RE)
+    total_gross_wt = find(_TOTAL_GROSS_WT_RE)
+    measurement_cbm = find(_MEASUREMENT_CBM_RE)
     if amount_usd == "NOT FOUND":
-        amount_usd = find(r'Total\s*[:\-]?\s*([0-9,.]+)')
+        amount_usd = find(_TOTAL_AMOUNT_RE)
+    hs_spans = [(m.start(), m.group(1), m.start(2)) for m in _HS_SPAN_RE.finditer(raw)] if goods_matches else []
     for match in goods_matches:
         hs, qty, weight, pack = match
-        desc_match = re.search(rf'HS\s*CODE\s*:\s*{re.escape(hs)}\s*([\s\S]*?)\s*QUANTITY', raw, FLAGS)
-        try:
-            desc_raw = desc_match.group(1) if desc_match else ""
-        except Exception:
-            desc_raw = ""
-        # Try to capture 1-2 lines just before the HS CODE (product names)
-        pre_hs_name = ""
-        # Try to capture 1-2 lines before HS CODE; handle cases with or without newline
-        pre_hs_context = re.search(rf'([^\r\n]{{8,240}})\s*[\r\n]+\s*HS\s*CODE\s*[:\-]?\s*{re.escape(hs)}', raw, FLAGS)
-        if not pre_hs_context:
-            pre_hs_context = re.search(rf'([^\r\n]{{8,240}})\s*HS\s*CODE\s*[:\-]?\s*{re.escape(hs)}', raw, FLAGS)
-        if pre_hs_context:
-            pre_hs_name = pre_hs_context.group(1).strip()
+        # description after HS CODE and 1-2 lines just before it (product names), sliced from the spans
+        pre_hs_name, desc_raw = _hs_context(raw, hs_spans, hs)
         # Preserve content and newlines (trim excessive length)
         combined_desc = (pre_hs_name + "\n" + (desc_raw or "")).strip()
         if combined_desc:
             combined_desc = combined_desc[:2200]
-            desc = re.sub(r'[ \t]{2,}', ' ', combined_desc).strip()
+            desc = _SPACE_RUN_RE.sub(' ', combined_desc).strip()
         else:
             desc = ""
         desc_full = desc
@@ -459,39 +855,36 @@ def extract_invoice_data(text: str) -> dict:
             extra.append(f"AMOUNT(USD): {amount_usd}")
         if extra:
             desc_full = (desc_full + "\n" + "\n".join(extra)).strip()
-        goods.append({
-            "hs_code": hs,
-            "description": desc_full,
-            "quantity": qty,
-            "weight": weight,
-            "packing": pack,
-            "unit": "PCS",
-            "rate": rate_per_unit if rate_per_unit != "NOT FOUND" else "",
-            "amount": amount_usd if amount_usd != "NOT FOUND" else "",
-            "units_mt": units_mt if units_mt != "NOT FOUND" else "",
-            "weight_measurements": weight_measurements,
-            "sr_marks": sr_marks_block
-        })
+        goods.append(GoodsRow(
+            hs_code=hs,
+            description=desc_full,
+            quantity=qty,
+            weight=weight,
+            packing=pack,
+            unit="PCS",
+            rate=rate_per_unit if rate_per_unit != "NOT FOUND" else "",
+            amount=amount_usd if amount_usd != "NOT FOUND" else "",
+            units_mt=units_mt if units_mt != "NOT FOUND" else "",
+            weight_measurements=weight_measurements,
+            sr_marks=sr_marks_block
+        ))
 
     # Fallback: common invoice layout (as in your screenshot)
     # Capture description block around HS CODE and TOTAL NET WEIGHT lines
     if not goods:
-        hs_only = re.search(r'HS\s*CODE\s*[:\-]?\s*([0-9\.]{6,10})', raw, FLAGS)
-        total_net_match = re.search(r'TOTAL\s*NET\s*WEIGHT\s*[:\-]?\s*([0-9,.]+)\s*MTS?', raw, FLAGS)
+        hs_only = _HS_ONLY_RE.search(raw)
+        total_net_match = _NET_WEIGHT_MT_RE.search(raw)
         # Description block with larger capture and preserving newlines
-        desc_after_hs_match = re.search(
-            r'HS\s*CODE\s*[:\-]?\s*[0-9\.]{6,10}\s*([\s\S]{0,3000}?)(?:TOTAL\s*NET\s*WEIGHT|TOTAL\s*GROSS\s*WEIGHT|Amount\s*Chargeable|BIN\s*NO|DECLARATION|RATE\s*PER|NO\.?\s*OF|$)',
-            raw, FLAGS
-        )
+        desc_after_hs_match = _DESC_AFTER_HS_RE.search(raw)
         desc_after_hs = desc_after_hs_match.group(1) if desc_after_hs_match else ""
-        pre_hs_match = re.search(r'([^\r\n]{8,240})\s*\r?\n\s*HS\s*CODE', raw, FLAGS)
+        pre_hs_match = _PRE_HS_LINE_RE.search(raw)
         if not pre_hs_match:
-            pre_hs_match = re.search(r'([^\r\n]{8,240})\s*HS\s*CODE', raw, FLAGS)
+            pre_hs_match = _PRE_HS_RE.search(raw)
         pre_hs = pre_hs_match.group(1).strip() if pre_hs_match else ""
         desc_block = (pre_hs + "\n" + desc_after_hs).strip()
-        desc_block = re.sub(r'[ \t]{2,}', ' ', desc_block)
-        units_guess = (total_net_match.group(1) if total_net_match else find(r'([0-9,.]+)\s*MTS?'))
-        amount_guess = find(r'Total\s*:?\s*([0-9,.]+)')
+        desc_block = _SPACE_RUN_RE.sub(' ', desc_block)
+        units_guess = (total_net_match.group(1) if total_net_match else find(_ANY_MT_RE))
+        amount_guess = find(_TOTAL_AMOUNT_LOOSE_RE)
         desc_full = desc_block
         if total_net_wt or total_gross_wt:
             tail = []
@@ -501,7 +894,7 @@ def extract_invoice_data(text: str) -> dict:
                 tail.append(f"TOTAL GROSS WEIGHT: {total_gross_wt} MTS")
             desc_full = (desc_block + "\n" + "\n".join(tail)).strip()
         # Prepend HS code when available
-        hs_code_val = (hs_only.group(1) if hs_only else find(r'HS\s*CODE\s*:?\s*([0-9\.]+)'))
+        hs_code_val = (hs_only.group(1) if hs_only else find(_HS_CODE_RE))
         if hs_code_val:
             desc_full = (f"HS CODE: {hs_code_val}\n" + desc_full).strip()
         # Compose weight & measurements
@@ -513,57 +906,34 @@ def extract_invoice_data(text: str) -> dict:
         if measurement_cbm and measurement_cbm != "NOT FOUND":
             wm_lines.append(f"MEASUREMENT: {measurement_cbm}")
         weight_measurements_fb = "\n".join(wm_lines)
-        goods.append({
-            "hs_code": hs_code_val,
-            "description": desc_full,
-            "quantity": "",
-            "weight": "",
-            "packing": "",
-            "unit": "",
-            "rate": rate_per_unit if rate_per_unit != "NOT FOUND" else "",
-            "amount": amount_guess if amount_guess else "",
-            "units_mt": units_guess if units_guess else "",
-            "weight_measurements": weight_measurements_fb,
+        goods.append(GoodsRow(
+            hs_code=hs_code_val,
+            description=desc_full,
+            rate=rate_per_unit if rate_per_unit != "NOT FOUND" else "",
+            amount=amount_guess if amount_guess else "",
+            units_mt=units_guess if units_guess else "",
+            weight_measurements=weight_measurements_fb,
             # include some invoice hints in fallback description
-            "description_full_fallback": desc_full,
-            "sr_marks": sr_marks_block
-        })
-
-    # ✨ RANDOM DEFAULTS FOR MISSING FIELDS
-    vessels = ["MSC LORETO", "CMA CGM NEVADA", "APL TOKYO", "MAERSK OHIO", "ONE HAMBURG", "WAN HAI 528", "EVER GIVEN"]
-    # Always randomize vessel/voyage per request
-    voyage_code = f"V.{random.randint(100,999)}{random.choice(list('ABCDE'))}"
-    vessel_voyage = f"{random.choice(vessels)} {voyage_code}"
-
-    container_no = ''.join(random.choices(string.ascii_uppercase, k=4)) + ''.join(random.choices(string.digits, k=7))
-    seal_no = ''.join(random.choices(string.digits, k=6))
-
-    # Delivery Agent: random always as requested
-    agents = [
-        "SEA LINE LOGISTICS PTE. LTD., Singapore",
-        "GULF STAR SHIPPING LLC, Dubai",
-        "PACIFIC FREIGHT SERVICES, Singapore",
-        "BLUE OCEAN LINES, Mumbai",
-        "NORTH HARBOUR AGENCIES, Singapore"
-    ]
-    delivery_agent = random.choice(agents)
+            description_full_fallback=desc_full,
+            sr_marks=sr_marks_block
+        ))
 
     # ✅ STRUCTURED OUTPUT
     # Final fallback: ensure exporter_name is populated if still empty by scanning exporter_block or raw
     if not exporter_name:
         # try first line from exporter_block
         if exporter_block:
-            lines = [ln.strip() for ln in re.split(r'[\r\n]+', exporter_block) if ln.strip()]
+            lines = [ln.strip() for ln in _LINES_RE.split(exporter_block) if ln.strip()]
             for ln in lines:
-                if ln and not re.search(r'^(Invoice|PO|I\.?E\.?|Buyer)', ln, re.IGNORECASE):
+                if ln and not _REF_PREFIX_RE.search(ln):
                     exporter_name = ln
                     break
         # try labeled 'Exporter:' in raw text
         if not exporter_name:
-            m = re.search(r'Exporter\s*[:\-]?\s*(.+)', raw, FLAGS)
+            m = _EXPORTER_REST_RE.search(raw)
             if m:
                 candidate = m.group(1).splitlines()[0].strip()
-                if candidate and not re.search(r'^(Invoice|PO|I\.?E\.?|Buyer)', candidate, re.IGNORECASE):
+                if candidate and not _REF_PREFIX_RE.search(candidate):
                     exporter_name = candidate
     return {
         "invoice_no": invoice_no,
@@ -593,62 +963,280 @@ def extract_invoice_data(text: str) -> dict:
         "container_no": container_no,
         "seal_no": seal_no,
         "goods": goods if goods else [],
-        "delivery_agent": delivery_agent,
+        "delivery_agent": "",
     }
 
+# ✨ RANDOM DEFAULTS FOR MISSING FIELDS
+_VESSELS = ["MSC LORETO", "CMA CGM NEVADA", "APL TOKYO", "MAERSK OHIO", "ONE HAMBURG", "WAN HAI 528", "EVER GIVEN"]
+_AGENTS = [
+    "SEA LINE LOGISTICS PTE. LTD., Singapore",
+    "GULF STAR SHIPPING LLC, Dubai",
+    "PACIFIC FREIGHT SERVICES, Singapore",
+    "BLUE OCEAN LINES, Mumbai",
+    "NORTH HARBOUR AGENCIES, Singapore"
+]
+
+def fill_random_defaults(data: dict) -> dict:
+    """Fill placeholder vessel/container/seal values when missing, and a random delivery agent."""
+    # Keep vessel/voyage and container/seal read from the invoice; randomize only when missing
+    if not data.get("vessel_voyage"):
+        voyage_code = f"V.{random.randint(100,999)}{random.choice('ABCDE')}"
+        data["vessel_voyage"] = f"{random.choice(_VESSELS)} {voyage_code}"
+    data["container_no"] = data.get("container_no") or random_container_no()
+    data["seal_no"] = data.get("seal_no") or random_seal_no()
+    # Delivery Agent: random always as requested
+    data["delivery_agent"] = random.choice(_AGENTS)
+    return data
+
+# Small thread-safe LRU map; callers key it on digests so whole inputs are not pinned in memory
+class _LRUCache:
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+def extract_invoice_data(text: str, fill_random: bool = True) -> dict:
+    """Extract structured invoice data using robust regex; fallback randoms for missing fields.
+
+    With fill_random=False, fields the invoice doesn't provide stay empty instead.
+    """
+    # Repeat uploads are served from _PDF_CACHE in the server process before the text ever
+    # reaches a parsing worker, so there is no second cache here
+    data = _parse_invoice_text(text)
+    return fill_random_defaults(data) if fill_random else data
+
+def _invoice_copy(parsed: dict, fill_random: bool) -> dict:
+    # hand out a copy: callers get fresh random fields and may mutate the result freely
+    data = dict(parsed, goods=[copy.copy(g) for g in parsed["goods"]])
+    return fill_random_defaults(data) if fill_random else data
+
 # -------------------------------------------------------
 # PDF GENERATION
 # -------------------------------------------------------
-def generate_bl_pdf(data: dict, template_path="image.jpeg") -> bytes:
-    """Overlay extracted data onto Bill of Lading template."""
-    buffer = io.BytesIO()
-    # Resolve background path safely; fallback if missing
-    bg_path = template_path if os.path.isabs(template_path) else os.path.join(os.path.dirname(__file__), template_path)
-    c = None
-    bg = None
+# The Bill of Lading template never changes: turn it into a PDF image XObject once at
+# startup and copy that into every generated PDF, so no request reads, decodes or
+# encodes the JPEG. Falls back to A4 once if the template is missing.
+_BG_PATH = os.path.join(os.path.dirname(__file__), "image.jpeg")
+_BG_MAX_SIZE = (1240, 1754)  # A4 @ 150 dpi is plenty for a printed B/L
+
+def _jpeg_xobject(name: str, jpeg: bytes) -> "pdfdoc.PDFImageXObject":
+    """Image XObject embedding the JPEG stream as-is (binary DCT, no ASCII85 inflation)."""
+    from reportlab.pdfbase import pdfdoc
+    xobj = pdfdoc.PDFImageXObject(name)
+    xobj.loadImageFromJPEG(io.BytesIO(jpeg))  # reads dimensions / colour space
+    xobj.streamContent, xobj._filters = jpeg, ("DCTDecode",)
+    return xobj
+
+@lru_cache(maxsize=8)
+def _template_for(path: str, mtime_ns: int):
+    """(width, height, XObject) for a background image, built once per file version."""
+    from PIL import Image
+    from reportlab.lib.pagesizes import A4
     try:
-        if os.path.exists(bg_path):
-            bg = Image.open(bg_path)
+        with Image.open(path) as bg:
+            # Page size stays in template pixels so all layout coordinates still apply
             w, h = bg.size
-            c = canvas.Canvas(buffer, pagesize=(w, h))
-            c.drawImage(ImageReader(bg), 0, 0, width=w, height=h)
-        else:
-            from reportlab.lib.pagesizes import A4
-            w, h = A4
-            c = canvas.Canvas(buffer, pagesize=A4)
+            if bg.format == "JPEG" and w <= _BG_MAX_SIZE[0] and h <= _BG_MAX_SIZE[1]:
+                # small enough: embed the original JPEG bytes untouched
+                with open(path, "rb") as f:
+                    jpeg = f.read()
+            else:
+                # oversized or not a JPEG: shrink once (JPEG scale-on-load, then thumbnail) and re-encode
+                bg.draft("RGB", _BG_MAX_SIZE)
+                small = bg.convert("RGB")
+                small.thumbnail(_BG_MAX_SIZE, Image.BILINEAR)
+                out = io.BytesIO()
+                small.save(out, "JPEG", quality=85)
+                jpeg = out.getvalue()
+        return w, h, _jpeg_xobject("BLTemplate", jpeg)
     except Exception:
+        return A4[0], A4[1], None
+
+def _load_template(path: str):
+    """Cached template for path; A4 without a background if it is missing or unreadable."""
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns  # a replaced template file gets rebuilt
+    except OSError:
         from reportlab.lib.pagesizes import A4
-        w, h = A4
-        c = canvas.Canvas(buffer, pagesize=A4)
-    finally:
-        if bg is not None:
-            try:
-                bg.close()
-            except Exception:
-                pass
-    c.setFont("Helvetica", 9)
+        return A4[0], A4[1], None
+    return _template_for(path, mtime_ns)
+
+# Helvetica advance widths (1/1000 em, indexed by character code) so draw_wrapped can
+# measure each word once instead of re-measuring every growing line candidate.
+@lru_cache(maxsize=None)
+def _helv_widths():
+    from reportlab.pdfbase.pdfmetrics import getFont
+    return getFont("Helvetica").widths
+
+@lru_cache(maxsize=4096)  # called per word; names, ports and units recur across fields and requests
+def _helv9_width(s: str) -> float:
+    """Width of s in Helvetica 9pt; table lookup for ASCII, ReportLab metrics otherwise."""
+    if s.isascii():
+        return sum(map(_helv_widths().__getitem__, s.encode())) * 9 / 1000.0
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    return stringWidth(s, "Helvetica", 9)
+
+_PARAGRAPH_SPLIT_RE = re.compile(r"\r?\n")
+
+@lru_cache(maxsize=1024)  # ports are drawn twice per page and whole blocks recur with repeat uploads
+def _wrap_lines(text: str, max_width: float, font: str = "Helvetica", font_size: int = 9, keep_blank: bool = False) -> tuple:
+    """Greedy word wrap: lines narrower than max_width, a new paragraph at every line break.
+
+    An empty paragraph gives an empty line; a whitespace-only one only does with keep_blank.
+    """
+    if (font, font_size) == ("Helvetica", 9):
+        measure = _helv9_width
+    else:
+        from reportlab.pdfbase.pdfmetrics import stringWidth
+        measure = lambda s: stringWidth(s, font, font_size)
+    lines = []
+    for para in _PARAGRAPH_SPLIT_RE.split(text):
+        if not para:
+            lines.append("")
+            continue
+        # running line width: each word is measured once instead of re-measuring the line
+        words, line, line_w = para.split(), "", 0.0
+        for word in words:
+            word_w = measure(f"{word} ")
+            if line_w + word_w < max_width:
+                line += f"{word} "
+                line_w += word_w
+            else:
+                lines.append(line.strip())
+                line, line_w = f"{word} ", word_w
+        if line or keep_blank:
+            lines.append(line.strip())
+    return tuple(lines)
+
+# Recycled output buffers. ReportLab writes the finished PDF in one write(), so a
+# rewound buffer is overwritten in place and keeps its allocation between requests.
+_BUF_POOL = queue.SimpleQueue()
+_BUF_POOL_MAX = 16
+
+def _acquire_buffer() -> io.BytesIO:
+    try:
+        buffer = _BUF_POOL.get_nowait()
+    except queue.Empty:
+        return io.BytesIO()
+    buffer.seek(0)
+    return buffer
+
+def _release_buffer(buffer: io.BytesIO) -> None:
+    if _BUF_POOL.qsize() < _BUF_POOL_MAX:
+        _BUF_POOL.put(buffer)
+
+# Header layout, as offsets from the top of the page
+_HEADER_LABELS = (  # (x, offset, label)
+    (70, 72, " SHIPPER:"),
+    (70, 200, "CONSIGNEE:"),
+    (70, 300, "NOTIFY PARTY:"),
+    (70, 460, "PLACE OF ACCEPTANCE:"),
+    (460, 460, "PORT OF LOADING:"),
+    (70, 510, "PORT OF DISCHARGE:"),
+    (460, 510, "PLACE OF DELIVERY:"),
+    (70, 410, "VESSEL/VOYAGE:"),
+)
+_HEADER_BODIES = (  # (data key, x, offset, max width)
+    ("consignee", 70, 220, 350),
+    ("notify_party", 70, 320, 350),
+    ("port_of_loading", 70, 480, 350),    # place of acceptance
+    ("port_of_loading", 460, 480, 350),
+    ("port_of_discharge", 70, 530, 350),
+    ("port_of_discharge", 460, 530, 350),  # place of delivery
+    ("vessel_voyage", 200, 410, 400),
+)
+
+@lru_cache(maxsize=None)
+def _header_layout(h: float):
+    """Absolute header positions for a page of height h; resolved once per page size."""
+    labels = tuple((x, h - dy, label) for x, dy, label in _HEADER_LABELS)
+    bodies = tuple((key, x, h - dy, max_width) for key, x, dy, max_width in _HEADER_BODIES)
+    return labels, bodies
+
+# Shipper box cleanup, line by line. Lines starting with an invoice / PO / IE Code label are
+# dropped, and a bare label also drops the next non-blank line (its value: 'Invoice No.' above
+# 'INV/001'). Labels are applied one after another, as the chained re.sub() calls were; a
+# leading 'Exporter:'/'Shipper:' label is then cut in one pass over the joined block
+_EXP_SKIP_LINE_RES = (
+    re.compile(r"\s*Invoice\s*No\.?", re.IGNORECASE),
+    re.compile(r"\s*Buyer'?s\s*Order\s*No\.?", re.IGNORECASE),
+    re.compile(r"\s*I\.?E\.?\s*Code\.?", re.IGNORECASE),
+)
+_EXP_LEAD_LABEL_RE = re.compile(r'^(?:Exporter|Shipper)\s*:?\s*', re.IGNORECASE | re.MULTILINE)
+
+def _drop_label_lines(lines: list, label_re: re.Pattern) -> list:
+    """lines minus those starting with label_re; a label with nothing after it takes its value line along."""
+    kept = []
+    take_value = False
+    for ln in lines:
+        if take_value:
+            take_value = not ln.strip()  # blank lines until the value go too
+            continue
+        m = label_re.match(ln)
+        if m is None:
+            kept.append(ln)
+        else:
+            take_value = not ln[m.end():].strip()
+    return kept
+
+# ...and anywhere in a line of the exporter name/address
+_EXP_NOISE_RE = re.compile(r"Invoice\s*No\.?|Buyer'?s\s*Order|I\.?E\.?\s*Code|I\.E\.\s*Code", re.IGNORECASE)
+
+def generate_bl_pdf(data: dict, template_path="image.jpeg") -> io.BytesIO:
+    """Overlay extracted data onto Bill of Lading template; returns the PDF buffer rewound to 0.
+
+    The buffer comes from a small pool; hand it back with _release_buffer() once sent.
+    """
+    from reportlab.pdfgen import canvas
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    # goods may also come in as plain dicts, the shape /generate-bl-json/ hands out
+    goods = [g if isinstance(g, GoodsRow) else GoodsRow.from_dict(g) for g in data.get("goods", [])]
+    buffer = _acquire_buffer()
+    # Resolve background path safely; fallback if missing
+    bg_path = template_path if os.path.isabs(template_path) else os.path.join(os.path.dirname(__file__), template_path)
+    w, h, template = _load_template(bg_path)
+    c = canvas.Canvas(buffer, pagesize=(w, h))
+    if template is not None:
+        # register a shallow copy (ReportLab tags objects with their owning
+        # document) that shares the pre-built JPEG stream, then paint it
+        c._doc.addForm(template.name, copy.copy(template))
+        c.saveState()
+        c.scale(w, h)
+        c.doForm(template.name)
+        c.restoreState()
+
+    # All text goes into one text object (a single BT..ET block, painted at the end)
+    # instead of a BT..ET per drawString; the wrapped blocks all step 11pt per line.
+    tobj = c.beginText()
+    current_font = [None]
+    def set_font(name, size):
+        if current_font[0] != (name, size):
+            tobj.setFont(name, size, 11)
+            current_font[0] = (name, size)
 
     def draw_wrapped(text, x, y, max_width):
         if not text: return
-        # Support multi-paragraph text (\n separated)
-        paragraphs = re.split(r"\r?\n", text)
-        line_offset = 0
-        for para in paragraphs:
-            if not para:
-                line_offset += 11
-                continue
-            words, lines, line = para.split(), [], ""
-            for word in words:
-                test = f"{line}{word} "
-                if c.stringWidth(test, "Helvetica", 9) < max_width:
-                    line = test
-                else:
-                    lines.append(line.strip())
-                    line = f"{word} "
-            lines.append(line.strip())
-            for l in lines:
-                c.drawString(x, y - line_offset, l)
-                line_offset += 11
+        # Support multi-paragraph text (\n separated); always measured as Helvetica 9
+        tobj.setTextOrigin(x, y)
+        tobj.textLines(_wrap_lines(text, max_width, keep_blank=True), trim=0)
+
+    def draw_right(x, y, text):
+        tobj.setTextOrigin(x - stringWidth(text, *current_font[0]), y)
+        tobj.textOut(text)
 
     def draw_wrapped_box(text, x, y, max_width, max_lines=None, align='left', font='Helvetica', font_size=9):
         """Draw wrapped text in a box. Returns height used in points.
@@ -656,53 +1244,42 @@ def generate_bl_pdf(data: dict, template_path="image.jpeg") -> bytes:
         """
         if not text:
             return 0
-        c.setFont(font, font_size)
-        paragraphs = re.split(r"\r?\n", text)
-        lines = []
-        for para in paragraphs:
-            if not para:
-                lines.append("")
-                continue
-            words = para.split()
-            line = ""
-            for word in words:
-                test = f"{line}{word} "
-                if c.stringWidth(test, font, font_size) < max_width:
-                    line = test
-                else:
-                    lines.append(line.strip())
-                    line = f"{word} "
-            if line:
-                lines.append(line.strip())
+        set_font(font, font_size)
+        lines = _wrap_lines(text, max_width, font, font_size)
         if max_lines is not None:
             lines = lines[:max_lines]
         line_height = font_size + 2
         for i, l in enumerate(lines):
             yy = y - (i * line_height)
             if align == 'left':
-                c.drawString(x, yy, l)
+                tobj.setTextOrigin(x, yy)
+                tobj.textOut(l)
             else:
                 # x is right edge for right-aligned text
-                c.drawRightString(x, yy, l)
+                draw_right(x, yy, l)
         return len(lines) * line_height
 
+    # Section labels: drawn in a single bold pass instead of toggling fonts per section
+    header_labels, header_bodies = _header_layout(h)
+    set_font("Helvetica-Bold", 10)
+    for x, y, label in header_labels:
+        tobj.setTextOrigin(x, y)
+        tobj.textOut(label)
+    tobj.setTextOrigin(450, h - 390)
+    tobj.textOut(f"B/L NO.: {data.get('invoice_no', '')}")
+
     # SHIPPER
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(70, h - 72, " SHIPPER:")
-    c.setFont("Helvetica", 9)
     # Prepare exporter display values and sanitize placeholder labels
     exp_name = (data.get("exporter_name") or "").strip()
     exp_block = (data.get("exporter") or "").strip()
     exp_address = (data.get("exporter_address") or "").strip()
     # Remove invoice/PO/IE Code lines from exporter block so they don't appear in the exporter box
     if exp_block:
-        exp_block = re.sub(r'(?mi)^\s*Invoice\s*No\.?\s*[:\-]?.*$\n?', '', exp_block)
-        exp_block = re.sub(r'(?mi)^\s*Buyer\'?s\s*Order\s*No\.?\s*[:\-]?.*$\n?', '', exp_block)
-        exp_block = re.sub(r'(?mi)^\s*I\.?E\.?\s*Code\.?\s*[:\-]?.*$\n?', '', exp_block)
-        exp_block = re.sub(r'(?mi)^\s*I\.E\.?\s*Code\.?\s*[:\-]?.*$\n?', '', exp_block)
         # Remove leading 'Exporter:' or 'Shipper:' labels if present so splitting yields name + address
-        exp_block = re.sub(r'(?mi)^(?:Exporter|Shipper)\s*:?\s*', '', exp_block)
-        exp_block = exp_block.strip()
+        lines = exp_block.split("\n")
+        for label_re in _EXP_SKIP_LINE_RES:
+            lines = _drop_label_lines(lines, label_re)
+        exp_block = _EXP_LEAD_LABEL_RE.sub('', "\n".join(lines)).strip()
     # remove accidental literal headings
     exp_name = re.sub(r'(?i)^Exporter\s*:?\s*$', '', exp_name).strip()
     # If no clean name, try to pick first non-heading line from exporter block
@@ -730,7 +1307,7 @@ def generate_bl_pdf(data: dict, template_path="image.jpeg") -> bytes:
         lines = [ln for ln in re.split(r'[\r\n]+', text) if ln.strip()]
         filtered = []
         for ln in lines:
-            if re.search(r'Invoice\s*No\.?|Buyer\'?s\s*Order|I\.?E\.?\s*Code|I\.E\.\s*Code', ln, re.IGNORECASE):
+            if _EXP_NOISE_RE.search(ln):
                 continue
             filtered.append(ln)
         return "\n".join(filtered).strip()
@@ -801,58 +1378,19 @@ def generate_bl_pdf(data: dict, template_path="image.jpeg") -> bytes:
             if candidate and exp_address and candidate in exp_address:
                 exp_address = '\n'.join([l for l in re.split(r'[\r\n]+', exp_address) if l.strip() and l.strip() != candidate]).strip()
     if exp_name:
-        c.setFont("Helvetica-Bold", 9)
+        set_font("Helvetica-Bold", 9)
         draw_wrapped(exp_name, 70, exp_y_top, 350)
+    set_font("Helvetica", 9)
     if exp_address:
-        c.setFont("Helvetica", 9)
         draw_wrapped(exp_address, 70, exp_y_top - 18, 350)
 
-    # CONSIGNEE
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(70, h - 200, "CONSIGNEE:")
-    c.setFont("Helvetica", 9)
-    draw_wrapped(data.get("consignee", ""), 70, h - 220, 350)
-
-    # NOTIFY PARTY
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(70, h - 300, "NOTIFY PARTY:")
-    c.setFont("Helvetica", 9)
-    draw_wrapped(data.get("notify_party", ""), 70, h - 320, 350)
-
-    # PORTS
-    # PLACE OF ACCEPTANCE
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(70, h - 460, "PLACE OF ACCEPTANCE:")
-    c.setFont("Helvetica", 9)
-    draw_wrapped(data.get("port_of_loading", ""), 70, h - 480, 350)
-
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(460, h - 460, "PORT OF LOADING:")
-    c.setFont("Helvetica", 9)
-    draw_wrapped(data.get("port_of_loading", ""), 460, h - 480, 350)
-
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(70, h - 510, "PORT OF DISCHARGE:")
-    c.setFont("Helvetica", 9)
-    draw_wrapped(data.get("port_of_discharge", ""), 70, h - 530, 350)
-    # Final Destination value suppressed in header area (per request)
-
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(460, h - 510, "PLACE OF DELIVERY:")
-    c.setFont("Helvetica", 9)
-    draw_wrapped(data.get("port_of_discharge", ""), 460, h - 530, 350)
+    # CONSIGNEE, NOTIFY PARTY, PORTS, VESSEL
+    # (Final Destination value suppressed in header area, per request)
+    for key, x, y, max_width in header_bodies:
+        draw_wrapped(data.get(key, ""), x, y, max_width)
 
     # Removed white rectangles as requested
 
-    # VESSEL / B/L NO.
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(70, h - 410, "VESSEL/VOYAGE:")
-    c.setFont("Helvetica", 9)
-    draw_wrapped(data.get("vessel_voyage", ""), 200, h - 410, 400)
-
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(450, h - 390, f"B/L NO.: {data.get('invoice_no', '')}")
-
     # GOODS table boxes mapping (tuned positions)
     left_box_x = 100          # fine tune columns
     desc_box_x = 330
@@ -864,9 +1402,8 @@ def generate_bl_pdf(data: dict, template_path="image.jpeg") -> bytes:
     s_no = data.get('seal_no', '')
     fcl_token = ''
     fcl_count = 6  # default to 1 container
-    goods_list_for_fcl = data.get('goods', [])
-    if goods_list_for_fcl:
-        possible_sr = goods_list_for_fcl[0].get('sr_marks', '') or ''
+    if goods:
+        possible_sr = goods[0].sr_marks or ''
         m_fcl = re.search(r"(\d+\s*X\s*20[\'\’\″\”\"]?\s*FCL)", possible_sr, re.IGNORECASE)
         if m_fcl:
             fcl_token = m_fcl.group(1)
@@ -874,17 +1411,17 @@ def generate_bl_pdf(data: dict, template_path="image.jpeg") -> bytes:
     if fcl_token or (c_no and s_no):
         top_container_y = y_start + 10
         line_h = 11
-        c.setFont("Helvetica", 9)
+        set_font("Helvetica", 9)
         if fcl_token:
             draw_wrapped(fcl_token, left_box_x, top_container_y, 200)
             top_container_y -= line_h
         
         # Draw container & seal information multiple times based on FCL count
         if c_no and s_no:
-            c.setFont("Helvetica-Bold", 8)
+            set_font("Helvetica-Bold", 8)
             draw_wrapped("Container & Seal nos.:", left_box_x, top_container_y, 200)
             top_container_y -= line_h
-            c.setFont("Helvetica", 8)
+            set_font("Helvetica", 8)
             
             # Repeat container/seal numbers based on FCL count
             for i in range(fcl_count):
@@ -895,18 +1432,18 @@ def generate_bl_pdf(data: dict, template_path="image.jpeg") -> bytes:
                     seal = s_no
                 else:
                     # Generate new random numbers for additional containers
-                    container = ''.join(random.choices(string.ascii_uppercase, k=4)) + ''.join(random.choices(string.digits, k=7))
-                    seal = ''.join(random.choices(string.digits, k=6))
+                    container = random_container_no()
+                    seal = random_seal_no()
                 
                 draw_wrapped(f"{container} / {seal}", left_box_x, top_container_y, 200)
                 top_container_y -= line_h
 
-    for i, good in enumerate(data.get("goods", [])):
+    for i, good in enumerate(goods):
         # push first row down slightly to avoid overlap with top container line
         row_y = y_start - (i * 115) - (20 if (i == 0 and (fcl_token or (c_no and s_no))) else 0)
-        c.setFont("Helvetica", 9)
+        set_font("Helvetica", 9)
         # Sr No & Marks – left column (remove any container/seal fragments and FCL tokens)
-        sr_text = good.get('sr_marks') or ''
+        sr_text = good.sr_marks or ''
         if sr_text:
             # remove container & seal and FCL occurrences to avoid duplication
             sr_clean = re.sub(r'Container\s*&\s*Seal\s*nos?\.?[:\-]?\s*.*', '', sr_text, flags=re.IGNORECASE).strip()
@@ -914,7 +1451,7 @@ def generate_bl_pdf(data: dict, template_path="image.jpeg") -> bytes:
             if sr_clean:
                 draw_wrapped(sr_clean, left_box_x, row_y, 200)
         # Description of Goods – middle column (preserve pre-HS line above HS CODE)
-        desc = good.get('description','') or ''
+        desc = good.description or ''
         # Normalize newlines and split
         desc_lines = [ln.strip() for ln in re.split(r'\r?\n', desc) if ln.strip()]
     # remove container & seal lines that sometimes appear in the description column
@@ -938,10 +1475,10 @@ def generate_bl_pdf(data: dict, template_path="image.jpeg") -> bytes:
         units_x = right_box_x
         rate_x = units_x + 100
     
-        draw_wrapped(str(good.get('units_mt','')), units_x, row_y, 80)
-        draw_wrapped(str(good.get('rate','')), rate_x, row_y, 80)
+        draw_wrapped(str(good.units_mt), units_x, row_y, 80)
+        draw_wrapped(str(good.rate), rate_x, row_y, 80)
         # Weight & Measurements details in the far-right narrow column
-        wm = good.get('weight_measurements','')
+        wm = good.weight_measurements
         if wm:
             wm_x = max(w - 155, rate_x + 120)
             draw_wrapped(wm, wm_x, row_y, 140)
@@ -957,62 +1494,148 @@ def generate_bl_pdf(data: dict, template_path="image.jpeg") -> bytes:
     heading_y = footer_y + 20
     # place data directly beneath the heading with a small gap
     data_y = heading_y - 14
-    c.setFont(heading_font, heading_size)
-    c.drawString(70, heading_y, "DELIVERY AGENT:")
-    c.setFont(data_font, data_size)
+    set_font(heading_font, heading_size)
+    tobj.setTextOrigin(70, heading_y)
+    tobj.textOut("DELIVERY AGENT:")
+    set_font(data_font, data_size)
     # left area: start at x=200, width ~420, limit to 3 lines to avoid overflow
     draw_wrapped_box(data.get("delivery_agent", ""), 150, data_y, 380, max_lines=3, align='left', font=data_font, font_size=data_size)
 
-    from datetime import datetime
     place = (data.get("port_of_loading") or data.get("place_of_receipt") or "").strip()
     today = datetime.now().strftime("%d-%m-%Y")
     place_date_text = f"{place}  {today}" if place else today
 
     # Place & Date: heading above the date block on the right
-    c.setFont(heading_font, heading_size)
-    c.drawRightString(w - 70, heading_y, "PLACE & DATE:")
-    c.setFont(data_font, data_size)
+    set_font(heading_font, heading_size)
+    draw_right(w - 70, heading_y, "PLACE & DATE:")
+    set_font(data_font, data_size)
     # right-edge is w - 70; limit to 2 lines and align right
     draw_wrapped_box(place_date_text, w - 70, data_y, 180, max_lines=2, align='right', font=data_font, font_size=data_size)
 
+    c.drawText(tobj)
     c.save()
-    return buffer.getvalue()
+    buffer.truncate()  # drop any tail left over from a larger previous PDF
+    buffer.seek(0)
+    return buffer
 
 # -------------------------------------------------------
 # API ROUTES
 # -------------------------------------------------------
+_STREAM_CHUNK_SIZE = 64 * 1024
+_MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+
+async def read_upload(upload: UploadFile) -> bytes:
+    """Read an uploaded PDF, rejecting it with 413 once it exceeds the size limit."""
+    if upload.size is not None:
+        # Starlette has already spooled the whole part and counted its bytes: one read of the
+        # spool, instead of chunk-by-chunk copies into a BytesIO and then out of it again
+        if upload.size > _MAX_UPLOAD_BYTES:
+            raise HTTPException(413, "PDF exceeds the 20 MB upload limit")
+        return await upload.read()
+    buf = io.BytesIO()
+    while chunk := await upload.read(_STREAM_CHUNK_SIZE):
+        buf.write(chunk)
+        if buf.tell() > _MAX_UPLOAD_BYTES:
+            raise HTTPException(413, "PDF exceeds the 20 MB upload limit")
+    return buf.getvalue()
+
+# Text extraction/OCR, the regex pass and ReportLab are blocking CPU work: run them off the
+# event loop so it keeps serving other uploads meanwhile. PyMuPDF and the pure-Python parser
+# hold the GIL, so those two stages go to worker processes for parallelism across cores
+# (spawned, not forked: the server process already runs threads). Rendering takes a couple of
+# ms and stays on threads, so its pooled buffer streams out without a cross-process copy.
+# The workers share one OCR_CONCURRENCY-slot semaphore, so concurrent scans start at most that
+# many tesseract runs between them rather than a full set per worker.
+_POOL_WORKERS = os.cpu_count() or 1
+_MP_CONTEXT = multiprocessing.get_context("spawn")
+_PROCESS_POOL = ProcessPoolExecutor(
+    max_workers=_POOL_WORKERS,
+    mp_context=_MP_CONTEXT,
+    initializer=_init_ocr_worker,
+    initargs=(_MP_CONTEXT.BoundedSemaphore(_OCR_CONCURRENCY),),
+)
+_EXECUTOR = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+
+async def run_blocking(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_EXECUTOR, func, *args)
+
+def _call_in_worker(func, *args):
+    # An exception the parent cannot unpickle (pytesseract's TesseractNotFoundError, for one)
+    # marks the whole pool broken; send those back as a plain RuntimeError instead
+    try:
+        return func(*args)
+    except Exception as e:
+        try:
+            pickle.loads(pickle.dumps(e))
+        except Exception:
+            raise RuntimeError(f"{type(e).__name__}: {e}") from None
+        raise
+
+async def run_cpu(func, *args):
+    """Like run_blocking, but in the process pool; func and its arguments must be picklable."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_PROCESS_POOL, _call_in_worker, func, *args)
+
+def _warm_worker() -> None:
+    """No-op job: submitting it starts a pool worker, which imports this module."""
+
+# Repeat uploads of the same PDF (retries, re-downloads, previews) skip the worker round trip:
+# keyed on the file's digest, holds the extracted text and the parsed data before random fill
+_PDF_CACHE = _LRUCache(maxsize=256)
+
+def _pdf_key(pdf_bytes: bytes) -> bytes:
+    if blake3 is not None:
+        return blake3.blake3(pdf_bytes).digest()
+    return hashlib.blake2b(pdf_bytes, digest_size=16).digest()
+
+async def extract_pdf(pdf_bytes: bytes, fill_random: bool = True):
+    """(text, data) for an uploaded PDF: text extraction/OCR plus the regex pass, cached per file."""
+    key = _pdf_key(pdf_bytes)
+    cached = _PDF_CACHE.get(key)
+    if cached is None:
+        text = await run_cpu(extract_text_from_pdf, pdf_bytes)
+        if not text:
+            raise HTTPException(422, "No readable text found in PDF")
+        cached = (text, await run_cpu(extract_invoice_data, text, False))
+        _PDF_CACHE.put(key, cached)
+    text, parsed = cached
+    return text, _invoice_copy(parsed, fill_random)
+
 @app.post("/generate-bl/")
 async def generate_bl(invoice_pdf: UploadFile = File(...)):
     if not invoice_pdf.filename.lower().endswith(".pdf"):
         raise HTTPException(400, "Only PDF files are accepted")
 
-    pdf_bytes = await invoice_pdf.read()
-    text = extract_text_from_pdf(pdf_bytes)
-    if not text:
-        raise HTTPException(422, "No readable text found in PDF")
-
-    data = extract_invoice_data(text)
-    # Debug: Print extracted port data
-    print(f"DEBUG - Port of Loading: '{data.get('port_of_loading', 'NOT_FOUND')}'")
-    print(f"DEBUG - Port of Discharge: '{data.get('port_of_discharge', 'NOT_FOUND')}'")
-    print(f"DEBUG - Exporter Name: '{data.get('exporter_name', 'NOT_FOUND')}'")
-    print(f"DEBUG - Exporter Block: '{data.get('exporter', 'NOT_FOUND')}'")
-    print(f"DEBUG - Consignee: '{data.get('consignee', 'NOT_FOUND')}'")
-    print(f"DEBUG - Raw text sample: '{text[:500]}'")
-    print(f"DEBUG - Raw text length: {len(text)}")
-    # Check for specific patterns in raw text
-    if 'Port' in text:
-        print("DEBUG - 'Port' found in text")
-    if 'Loading' in text:
-        print("DEBUG - 'Loading' found in text") 
-    if 'Discharge' in text:
-        print("DEBUG - 'Discharge' found in text")
-    bl_pdf = generate_bl_pdf(data, "image.jpeg")
-
-    return Response(
-        content=bl_pdf,
+    pdf_bytes = await read_upload(invoice_pdf)
+    text, data = await extract_pdf(pdf_bytes)
+    # Debug: log extracted port data (only built when DEBUG logging is on)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Port of Loading: %r", data.get('port_of_loading', 'NOT_FOUND'))
+        logger.debug("Port of Discharge: %r", data.get('port_of_discharge', 'NOT_FOUND'))
+        logger.debug("Exporter Name: %r", data.get('exporter_name', 'NOT_FOUND'))
+        logger.debug("Exporter Block: %r", data.get('exporter', 'NOT_FOUND'))
+        logger.debug("Consignee: %r", data.get('consignee', 'NOT_FOUND'))
+        logger.debug("Raw text sample: %r", text[:500])
+        logger.debug("Raw text length: %d", len(text))
+        # Check for specific patterns in raw text
+        if 'Port' in text:
+            logger.debug("'Port' found in text")
+        if 'Loading' in text:
+            logger.debug("'Loading' found in text")
+        if 'Discharge' in text:
+            logger.debug("'Discharge' found in text")
+    buffer = await run_blocking(generate_bl_pdf, data, "image.jpeg")
+
+    # Stream straight out of the ReportLab buffer instead of copying it into a bytes body
+    return StreamingResponse(
+        iter(lambda: buffer.read(_STREAM_CHUNK_SIZE), b""),
         media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=BL_{data.get('invoice_no','Unknown')}.pdf"}
+        headers={
+            "Content-Disposition": f"attachment; filename=BL_{data.get('invoice_no','Unknown')}.pdf",
+            "Content-Length": str(buffer.getbuffer().nbytes),
+        },
+        background=BackgroundTask(_release_buffer, buffer),
     )
 
 @app.post("/generate-bl-json/")
@@ -1020,12 +1643,12 @@ async def generate_bl_json(invoice_pdf: UploadFile = File(...)):
     if not invoice_pdf.filename.lower().endswith(".pdf"):
         raise HTTPException(400, "Only PDF files are accepted")
 
-    pdf_bytes = await invoice_pdf.read()
-    text = extract_text_from_pdf(pdf_bytes)
-    if not text:
-        raise HTTPException(422, "No readable text found in PDF")
-
-    data = extract_invoice_data(text)
+    pdf_bytes = await read_upload(invoice_pdf)
+    # JSON callers get what the invoice says: no placeholder vessel/container/seal/agent
+    _text, data = await extract_pdf(pdf_bytes, False)
+    data["goods"] = [g.to_dict() for g in data["goods"]]
+    if orjson is not None:
+        return Response(content=orjson.dumps(data), media_type="application/json")
     return JSONResponse(content=data)
 
 @app.get("/")
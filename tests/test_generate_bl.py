@@ -0,0 +1,32 @@
+import unittest
+
+import pypdfium2 as pdfium
+
+import main
+from tests.test_shipment_fields import parse
+
+
+def pdf_text(buffer):
+    doc = pdfium.PdfDocument(buffer.getvalue())
+    try:
+        return doc[0].get_textpage().get_text_range()
+    finally:
+        doc.close()
+
+
+class GenerateBlTest(unittest.TestCase):
+    def test_goods_as_dicts(self):
+        # no container/seal: the extra container lines are random
+        data = dict(parse(), container_no="", seal_no="")
+        from_rows = pdf_text(main.generate_bl_pdf(data))
+        from_dicts = pdf_text(main.generate_bl_pdf(dict(data, goods=[g.to_dict() for g in data["goods"]])))
+        self.assertEqual(from_rows, from_dicts)
+        self.assertIn("17019990", from_rows)
+
+    def test_partial_goods_dict(self):
+        data = {"goods": [{"sr_marks": "x", "description": "WHITE SUGAR", "extra": 1}]}
+        self.assertIn("WHITE SUGAR", pdf_text(main.generate_bl_pdf(data)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pymupdf
+import pytesseract
+
+import main
+
+
+def scanned_pdf(pages):
+    """A PDF with blank pages and no text layer, so extraction falls back to OCR."""
+    with pymupdf.open() as doc:
+        for _ in range(pages):
+            doc.new_page(width=200, height=200)
+        return doc.tobytes()
+
+
+class OcrConcurrencyTest(unittest.TestCase):
+    def run_scan(self, concurrency, slots=None, pages=6):
+        lock = threading.Lock()
+        running = [0, 0]  # current, peak
+
+        def image_to_string(img, config=""):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+            return "page"
+
+        with mock.patch.object(main, "_OCR_CONCURRENCY", concurrency), \
+                mock.patch.object(main, "_OCR_EXECUTOR", ThreadPoolExecutor(max_workers=concurrency)), \
+                mock.patch.object(main, "_OCR_SLOTS", slots), \
+                mock.patch.object(main, "_tesserocr", lambda: None), \
+                mock.patch.object(pytesseract, "image_to_string", image_to_string):
+            text = main.extract_text_from_pdf(scanned_pdf(pages))
+        self.assertEqual(text.split("\n"), ["page"] * pages)
+        return running[1]
+
+    def test_pages_of_one_scan_run_in_parallel(self):
+        self.assertGreater(self.run_scan(concurrency=3), 1)
+
+    def test_shared_slots_cap_tesseract_runs(self):
+        self.assertEqual(self.run_scan(concurrency=4, slots=threading.BoundedSemaphore(2)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
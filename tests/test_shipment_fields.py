@@ -0,0 +1,65 @@
+import unittest
+
+import main
+
+INVOICE = """SHRADDHA IMPEX
+Exporter: SHRADDHA IMPEX
+Invoice No: INV-2024/001
+Consignee: GLOBAL SUGAR TRADING BV
+Notify Party: SAME AS CONSIGNEE
+Pre-Carriage By: Truck
+{vessel}
+Port of Loading: Nhava Sheva, India
+Port of Discharge: Rotterdam
+Terms of Payment: CAD at sight
+{container}
+06 X 20' FCL
+HS CODE: 17019990
+QUANTITY: 1,200 PCS
+"""
+VESSEL = "Vessel/Voyage: MSC ANNA V.123A"
+CONTAINER = "Container & Seal nos: MSCU1234567 / 998877"
+
+
+def parse(vessel=VESSEL, container=CONTAINER):
+    return main.extract_invoice_data(INVOICE.format(vessel=vessel, container=container), fill_random=False)
+
+
+class VesselVoyageTest(unittest.TestCase):
+    def test_value_on_label_line(self):
+        self.assertEqual(parse()["vessel_voyage"], "MSC ANNA V.123A")
+
+    def test_stops_at_label_on_same_row(self):
+        data = parse(vessel="Vessel/Voyage: MSC LORETO V.123A Place of Receipt: Mumbai")
+        self.assertEqual(data["vessel_voyage"], "MSC LORETO V.123A")
+        data = parse(vessel="Vessel/Voyage MSC LORETO V.123A Port of Delivery")
+        self.assertEqual(data["vessel_voyage"], "MSC LORETO V.123A")
+
+    def test_label_is_not_taken_as_value(self):
+        self.assertEqual(parse(vessel="Vessel/Voyage Port of Loading\nMSC X V.1")["vessel_voyage"], "")
+
+    def test_does_not_cross_into_next_line(self):
+        self.assertEqual(parse(vessel="Vessel/Voyage:")["vessel_voyage"], "")
+
+    def test_missing_value_gets_random_default(self):
+        data = main.fill_random_defaults(parse(vessel="Vessel/Voyage:"))
+        self.assertTrue(data["vessel_voyage"])
+
+
+class ContainerSealTest(unittest.TestCase):
+    def test_container_and_seal(self):
+        data = parse()
+        self.assertEqual((data["container_no"], data["seal_no"]), ("MSCU1234567", "998877"))
+
+    def test_free_text_is_rejected(self):
+        data = parse(container="Container & Seal nos.: As per packing list")
+        self.assertEqual((data["container_no"], data["seal_no"]), ("", ""))
+
+    def test_rejected_values_get_random_defaults(self):
+        data = main.fill_random_defaults(parse(container="Container & Seal nos.: As per packing list"))
+        self.assertRegex(data["container_no"], r"^[A-Z]{4}\d{7}$")
+        self.assertNotEqual(data["seal_no"], "per")
+
+
+if __name__ == "__main__":
+    unittest.main()